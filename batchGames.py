@@ -0,0 +1,263 @@
+# batchGames.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Many classic Pacman games on the same layout, advanced together in NumPy
+arrays (NumPy is required by this module only).
+
+A GameBatch plays the rules of pacman.py (PacmanRules and GhostRules) for
+numGames games at once.  Pacman's actions are given for every game at each
+step, and the ghosts are RandomGhosts or DirectionalGhosts whose choices are
+computed for all games together.  Game i draws its random numbers from
+random.Random(seeds[i]), exactly as the ghosts of a single game draw them from
+the random module after random.seed(seeds[i]), so it plays the same game:
+
+> batch = GameBatch(layout.getLayout('smallClassic'), [RandomGhost(1), RandomGhost(2)], 1000)
+> while not batch.done.all():
+>     batch.step(batch.randomPacmanActions(rng))
+"""
+
+import random
+
+import numpy
+
+from game import Actions
+from game import Directions
+from game import DIRECTIONS
+import ghostAgents
+import pacman
+
+# Action numbers are those of game.DIRECTIONS
+STOP = DIRECTIONS.index(Directions.STOP)
+VECTORS = numpy.array([Actions.directionToVector(direction) for direction in DIRECTIONS])
+# util.sample goes through the actions of a distribution in sorted order
+SAMPLE_ORDER = sorted(range(4), key=lambda action: DIRECTIONS[action])
+
+class GameBatch:
+    """
+    numGames games of classic Pacman on layout, against the given ghost
+    agents (RandomGhosts and DirectionalGhosts), in lockstep.
+
+    The state of game i is in row i of the arrays:
+
+      pacmanPosition   (numGames, 2) ints
+      pacmanDirection  (numGames,) action numbers (see DIRECTIONS)
+      ghostPositions   (numGames, numGhosts, 2) floats (halves when scared)
+      ghostDirections  (numGames, numGhosts) action numbers
+      scaredTimers     (numGames, numGhosts)
+      food, capsules   (numGames, width * height) booleans, cell x * height + y
+      numFood, score, numMoves (agent moves, like len(Game.moveHistory))
+      win, lose, done
+    """
+    def __init__(self, layout, ghosts, numGames, seeds=None):
+        self.layout = layout
+        self.numGames = numGames
+        self.height = layout.height
+        startState = pacman.GameState()
+        startState.initialize(layout, len(ghosts))
+        agentStates = startState.data.agentStates
+        self.ghosts = ghosts[:len(agentStates) - 1]
+        for ghost in self.ghosts:
+            if type(ghost) not in (ghostAgents.RandomGhost, ghostAgents.DirectionalGhost):
+                raise Exception('GameBatch only plays RandomGhosts and DirectionalGhosts, not ' + type(ghost).__name__)
+        self.numGhosts = len(self.ghosts)
+        self.pacmanStart = numpy.array(agentStates[0].start.pos, dtype=int)
+        self.ghostStarts = numpy.array([state.start.pos for state in agentStates[1:]], dtype=float).reshape(-1, 2)
+        self.startFood = numpy.array(layout.food.data, dtype=bool).reshape(-1)
+        self.startCapsules = numpy.zeros(self.startFood.shape, dtype=bool)
+        for x, y in layout.capsules: self.startCapsules[x * self.height + y] = True
+
+        # Legal actions on each grid point, from the layout's tables
+        cells = len(layout.legalActions)
+        self.legalPacman = numpy.zeros((cells, 5), dtype=bool)
+        self.legalGhost = numpy.zeros((5, cells, 4), dtype=bool)
+        for cell, actions in enumerate(layout.legalActions):
+            for action in actions or ():
+                self.legalPacman[cell, DIRECTIONS.index(action)] = True
+        for heading, table in layout.ghostActions.items():
+            for cell, actions in enumerate(table):
+                for action in actions or ():
+                    self.legalGhost[DIRECTIONS.index(heading), cell, DIRECTIONS.index(action)] = True
+        self.reset(seeds)
+
+    def reset(self, seeds=None):
+        """
+        Starts all the games again, with the given random seeds (by default,
+        numbers drawn from the random module).
+        """
+        n, k = self.numGames, self.numGhosts
+        if seeds is None: seeds = [random.randrange(1 << 32) for i in range(n)]
+        self.seeds = list(seeds)
+        self.randoms = [random.Random(seed) for seed in self.seeds]
+        self.pacmanPosition = numpy.tile(self.pacmanStart, (n, 1))
+        self.pacmanDirection = numpy.full(n, STOP)
+        self.ghostPositions = numpy.tile(self.ghostStarts, (n, 1, 1))
+        self.ghostDirections = numpy.full((n, k), STOP)
+        self.scaredTimers = numpy.zeros((n, k), dtype=int)
+        self.food = numpy.tile(self.startFood, (n, 1))
+        self.capsules = numpy.tile(self.startCapsules, (n, 1))
+        self.numFood = self.food.sum(axis=1)
+        self.score = numpy.zeros(n, dtype=int)
+        self.numMoves = numpy.zeros(n, dtype=int)
+        self.win = numpy.zeros(n, dtype=bool)
+        self.lose = numpy.zeros(n, dtype=bool)
+        self.done = numpy.zeros(n, dtype=bool)
+
+    def legalPacmanActions(self):
+        "Returns a (numGames, 5) boolean array of Pacman's legal actions."
+        x, y = self.pacmanPosition[:, 0], self.pacmanPosition[:, 1]
+        return self.legalPacman[x * self.height + y]
+
+    def randomPacmanActions(self, rng):
+        "Returns a legal Pacman action per game, drawn from the numpy Generator rng."
+        legal = self.legalPacmanActions()
+        choice = (rng.random(self.numGames) * legal.sum(axis=1)).astype(int)
+        return (legal.cumsum(axis=1) <= choice[:, None]).sum(axis=1)
+
+    def step(self, pacmanActions):
+        """
+        Plays a round in every game that is not over: Pacman's action (an
+        action number per game, ignored for finished games), then each ghost's.
+        Returns the score change of each game.
+        """
+        pacmanActions = numpy.asarray(pacmanActions)
+        scoreBefore = self.score.copy()
+        self._movePacman(numpy.flatnonzero(~self.done), pacmanActions)
+        for ghost in range(self.numGhosts):
+            self._moveGhost(numpy.flatnonzero(~self.done), ghost)
+        return self.score - scoreBefore
+
+    def _movePacman(self, games, actions):
+        actions = actions[games]
+        if not self.legalPacmanActions()[games, actions].all():
+            raise Exception('Illegal action')
+        scoreChange = numpy.zeros(len(games), dtype=int)
+        position = self.pacmanPosition[games] + VECTORS[actions].astype(int)
+        self.pacmanPosition[games] = position
+        self.pacmanDirection[games] = numpy.where(actions == STOP, self.pacmanDirection[games], actions)
+
+        # Eat food and capsules
+        cells = position[:, 0] * self.height + position[:, 1]
+        ate = self.food[games, cells]
+        self.food[games[ate], cells[ate]] = False
+        self.numFood[games] -= ate
+        scoreChange += 10 * ate
+        won = ate & (self.numFood[games] == 0)
+        scoreChange += 500 * won
+        self.win[games] |= won
+        capsule = self.capsules[games, cells]
+        self.capsules[games[capsule], cells[capsule]] = False
+        self.scaredTimers[games[capsule]] = pacman.SCARED_TIME
+
+        scoreChange -= pacman.TIME_PENALTY
+        for ghost in range(self.numGhosts):
+            scoreChange += self._checkDeath(games, ghost)
+        self._endMove(games, scoreChange)
+
+    def _moveGhost(self, games, ghost):
+        legal = self._legalGhostActions(games, ghost)
+        if type(self.ghosts[ghost]) == ghostAgents.DirectionalGhost:
+            probabilities = self._directionalDistribution(games, ghost, legal)
+        else:
+            probabilities = numpy.where(legal, 1.0 / legal.sum(axis=1)[:, None], 0.0)
+        actions = self._sample(games, legal, probabilities)
+
+        scared = self.scaredTimers[games, ghost] > 0
+        speed = numpy.where(scared, pacman.GhostRules.GHOST_SPEED / 2.0, pacman.GhostRules.GHOST_SPEED)
+        position = self.ghostPositions[games, ghost] + VECTORS[actions] * speed[:, None]
+        self.ghostDirections[games, ghost] = actions
+
+        # Time passes
+        timers = self.scaredTimers[games, ghost]
+        position = numpy.where((timers == 1)[:, None], numpy.floor(position + 0.5), position)
+        self.ghostPositions[games, ghost] = position
+        self.scaredTimers[games, ghost] = numpy.maximum(0, timers - 1)
+
+        self._endMove(games, self._checkDeath(games, ghost))
+
+    def _legalGhostActions(self, games, ghost):
+        "GhostRules.getLegalActions; between grid points, ghosts keep going."
+        position = self.ghostPositions[games, ghost]
+        direction = self.ghostDirections[games, ghost]
+        onGrid = (position == numpy.floor(position)).all(axis=1)
+        cells = position[:, 0].astype(int) * self.height + position[:, 1].astype(int)
+        legal = self.legalGhost[direction, cells]
+        straight = numpy.zeros(legal.shape, dtype=bool)
+        straight[numpy.arange(len(games)), numpy.minimum(direction, 3)] = True
+        return numpy.where(onGrid[:, None], legal, straight)
+
+    def _directionalDistribution(self, games, ghost, legal):
+        """
+        DirectionalGhost.getDistribution, down to the order of the floating
+        point operations of the Counter it builds.
+        """
+        agent = self.ghosts[ghost]
+        scared = self.scaredTimers[games, ghost] > 0
+        speed = numpy.where(scared, 0.5, 1.0)
+        position = self.ghostPositions[games, ghost]
+        pacmanPosition = self.pacmanPosition[games]
+        distances = numpy.zeros(legal.shape)
+        for action in range(4):
+            newPosition = position + VECTORS[action] * speed[:, None]
+            distances[:, action] = (numpy.abs(newPosition[:, 0] - pacmanPosition[:, 0]) +
+                                    numpy.abs(newPosition[:, 1] - pacmanPosition[:, 1]))
+        bestScore = numpy.where(scared, numpy.where(legal, distances, -numpy.inf).max(axis=1),
+                                        numpy.where(legal, distances, numpy.inf).min(axis=1))
+        best = legal & (distances == bestScore[:, None])
+        bestProb = numpy.where(scared, agent.prob_scaredFlee, agent.prob_attack)
+        numBest, numLegal = best.sum(axis=1), legal.sum(axis=1)
+        other = (1 - bestProb) / numLegal
+        bestValue = bestProb / numBest + other
+        # Counter.normalize sums the best actions first, then the others
+        total = numpy.zeros(len(games))
+        for i in range(4):
+            total += numpy.where(i < numBest, bestValue, numpy.where(i < numLegal, other, 0.0))
+        return numpy.where(best, (bestValue / total)[:, None], numpy.where(legal, (other / total)[:, None], 0.0))
+
+    def _sample(self, games, legal, probabilities):
+        "util.chooseFromDistribution of each game's distribution, with its random numbers."
+        total = numpy.zeros(len(games))
+        for action in SAMPLE_ORDER:
+            total = numpy.where(legal[:, action], total + probabilities[:, action], total)
+        probabilities = numpy.where((total != 1)[:, None], probabilities / total[:, None], probabilities)
+        choice = numpy.array([self.randoms[game].random() for game in games])
+        actions = numpy.full(len(games), -1)
+        cumulative = numpy.zeros(len(games))
+        for action in SAMPLE_ORDER:
+            cumulative = numpy.where(legal[:, action], cumulative + probabilities[:, action], cumulative)
+            chosen = (actions < 0) & legal[:, action] & (choice <= cumulative)
+            actions[chosen] = action
+        return numpy.where(actions < 0, SAMPLE_ORDER[-1], actions)
+
+    def _checkDeath(self, games, ghost):
+        """
+        GhostRules.checkDeath for one ghost; returns the score changes, and
+        updates the ghost and the lose flags.
+        """
+        position = self.ghostPositions[games, ghost]
+        pacmanPosition = self.pacmanPosition[games]
+        distance = numpy.abs(position[:, 0] - pacmanPosition[:, 0]) + numpy.abs(position[:, 1] - pacmanPosition[:, 1])
+        caught = distance <= pacman.COLLISION_TOLERANCE
+        eaten = caught & (self.scaredTimers[games, ghost] > 0)
+        self.ghostPositions[games[eaten], ghost] = self.ghostStarts[ghost]
+        self.ghostDirections[games[eaten], ghost] = STOP
+        self.scaredTimers[games[eaten], ghost] = 0
+        killed = caught & ~eaten & ~self.win[games]
+        self.lose[games] |= killed
+        return 200 * eaten - 500 * killed
+
+    def _endMove(self, games, scoreChange):
+        self.score[games] += scoreChange
+        self.numMoves[games] += 1
+        self.done[games] = self.win[games] | self.lose[games]
@@ -0,0 +1,539 @@
+# benchmarks.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Timing benchmarks for the search code and the game engine.  To list the
+benchmarks, or run some of them:
+
+> python benchmarks.py
+> python benchmarks.py costGrid
+"""
+
+import sys
+import time
+
+import game
+import layout
+import pacman
+import search
+import searchAgents
+
+def bestTime(function, repeat=5, number=1):
+    """
+    Returns the best wall-clock time, in seconds, of number calls to
+    function, over repeat runs.
+    """
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        for j in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best: best = elapsed
+    return best
+
+def report(name, seconds, number=1):
+    print('  %-48s %10.3f ms' % (name, 1000.0 * seconds / number))
+
+def startState(layoutName, numGhosts=0):
+    state = pacman.GameState()
+    state.initialize(layout.getLayout(layoutName), numGhosts)
+    return state
+
+def benchmarkAgentStates():
+    "Memory and copy time of AgentStates and Configurations."
+    import tracemalloc
+    number = 10000
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    states = [game.AgentState(game.Configuration((i, i), game.Directions.STOP), False) for i in range(number)]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print('%d AgentStates with their Configurations: %.1f bytes each' % (number, float(size) / number))
+    state = states[0]
+    report('AgentState.copy, per 1000 calls', bestTime(state.copy, number=number), number / 1000.0)
+    configuration = state.configuration
+    report('Configuration.generateSuccessor, per 1000 calls',
+           bestTime(lambda: configuration.generateSuccessor((1, 0)), number=number), number / 1000.0)
+
+def benchmarkBatch():
+    "GameBatch against single games, random Pacman and DirectionalGhosts on smallClassic."
+    import random
+    import numpy
+    import batchGames
+    import ghostAgents
+    import textDisplay
+    theLayout = layout.getLayout('smallClassic')
+    numGames = 1000
+    ghosts = [ghostAgents.DirectionalGhost(i + 1) for i in range(2)]
+    history = [[] for i in range(numGames)]
+    def batch():
+        games = batchGames.GameBatch(theLayout, ghosts, numGames, seeds=range(numGames))
+        rng = numpy.random.default_rng(0)
+        for moves in history: del moves[:]
+        while not games.done.all():
+            actions = games.randomPacmanActions(rng)
+            for i in numpy.flatnonzero(~games.done): history[i].append(batchGames.DIRECTIONS[actions[i]])
+            games.step(actions)
+        return games
+    class ReplayAgent(game.Agent):
+        def __init__(self, actions):
+            self.actions = iter(actions)
+        def getAction(self, state):
+            return next(self.actions)
+    def single():
+        results = []
+        for i in range(numGames):
+            random.seed(i)
+            g = pacman.ClassicGameRules().newGame(theLayout, ReplayAgent(history[i]), ghosts, textDisplay.NullGraphics(), True, False, True)
+            g.run()
+            results.append((g.state.getScore(), g.state.isWin(), len(g.moveHistory)))
+        return results
+    games = batch()
+    if single() != [(float(games.score[i]), bool(games.win[i]), int(games.numMoves[i])) for i in range(numGames)]:
+        raise Exception('GameBatch disagrees with single games')
+    report('%d games in a GameBatch (%d moves)' % (numGames, games.numMoves.sum()), bestTime(batch, repeat=3))
+    report('%d single games, Game.runFast' % numGames, bestTime(single, repeat=1))
+
+def benchmarkCostGrid():
+    "UCS with the StayEast/StayWest cost functions, with and without cost grids."
+    for layoutName, costFn, goal in [('mediumDottedMaze', lambda pos: .5 ** pos[0], (1, 1)),
+                                     ('mediumScaryMaze', lambda pos: 2 ** pos[0], (1, 1))]:
+        state = startState(layoutName)
+        print(layoutName)
+        build = lambda: searchAgents.costGrid(state.getWalls(), costFn)
+        report('costGrid build (once per walls and costFn)', bestTime(build, number=20), 20)
+        for precompute in [False, True]:
+            def run():
+                problem = searchAgents.PositionSearchProblem(state, costFn, goal, None, False, False, precompute)
+                problem.getCostOfActions(search.ucs(problem))
+            report('ucs + getCostOfActions, precomputeCosts=%s' % precompute, bestTime(run, number=20), 20)
+
+def benchmarkGrid():
+    "Grid operations on the largest layouts, list-of-lists Grid vs ByteGrid."
+    for layoutName in ['bigMaze', 'bigCorners', 'openMaze', 'originalClassic']:
+        print(layoutName)
+        for gridClass in [game.Grid, game.ByteGrid]:
+            walls = layout.getLayout(layoutName, gridClass=gridClass).walls
+            other = walls.copy()
+            cells = [(x, y) for x in range(walls.width) for y in range(walls.height)]
+            operations = [('copy', walls.copy),
+                          ('count', walls.count),
+                          ('asList', walls.asList),
+                          ('==', lambda: walls == other),
+                          ('hash', lambda: hash(walls)),
+                          ('read every cell', lambda: [walls[x][y] for x, y in cells])]
+            for name, operation in operations:
+                report('%s %s' % (gridClass.__name__, name), bestTime(operation, number=200), 200)
+
+def benchmarkHashing():
+    "Hashing game states and food grids while playing and searching."
+    import random
+    state = startState('originalClassic', 4)
+    states = []
+    random.seed(0)
+    while len(states) < 500 and not (state.isWin() or state.isLose()):
+        for agentIndex in range(state.getNumAgents()):
+            if state.isWin() or state.isLose(): break
+            state = state.generateSuccessor(agentIndex, random.choice(state.getLegalActions(agentIndex)))
+            states.append(state)
+    def hashAll():
+        for s in states:
+            s.data._hash = None
+            hash(s)
+    report('originalClassic: hash %d states' % len(states), bestTime(hashAll))
+    for layoutName in ['tinySearch']:
+        state = startState(layoutName)
+        run = lambda: search.bfs(searchAgents.FoodSearchProblem(state))
+        report('%s: bfs on FoodSearchProblem' % layoutName, bestTime(run, repeat=3))
+
+def benchmarkPackBits():
+    "Grid.packBits/reconstituteGrid and the binary toBytes/gridFromBytes format."
+    import pickle
+    for layoutName in ['bigMaze', 'originalClassic']:
+        walls = layout.getLayout(layoutName).walls
+        packed, data = walls.packBits(), walls.toBytes()
+        print('%s (packBits: %d ints, toBytes: %d bytes, pickle: %d bytes)' % (
+            layoutName, len(packed), len(data), len(pickle.dumps(walls))))
+        report('packBits', bestTime(walls.packBits, number=100), 100)
+        report('reconstituteGrid', bestTime(lambda: game.reconstituteGrid(packed), number=100), 100)
+        report('toBytes', bestTime(walls.toBytes, number=100), 100)
+        report('gridFromBytes', bestTime(lambda: game.gridFromBytes(data), number=100), 100)
+        grids = [walls] * 100
+        report('packGrids + unpackGrids, 100 grids', bestTime(lambda: game.unpackGrids(game.packGrids(grids))))
+
+def benchmarkPlanes():
+    "StatePlanes feature planes, against building them from asList and friends."
+    import random
+    import numpy
+    import statePlanes
+    from util import nearestPoint
+    theLayout = layout.getLayout('originalClassic')
+    state = startState('originalClassic', 4)
+    states = []
+    random.seed(0)
+    while len(states) < 200 and not (state.isWin() or state.isLose()):
+        agentIndex = len(states) % state.getNumAgents()
+        state = state.generateSuccessor(agentIndex, random.choice(state.getLegalActions(agentIndex)))
+        states.append(state)
+    def loops():
+        for state in states:
+            planes = numpy.zeros((statePlanes.NUM_PLANES, theLayout.width, theLayout.height), dtype=numpy.float32)
+            for x, y in state.getWalls().asList(): planes[statePlanes.WALLS, x, y] = 1
+            for x, y in state.getFood().asList(): planes[statePlanes.FOOD, x, y] = 1
+            for x, y in state.getCapsules(): planes[statePlanes.CAPSULES, x, y] = 1
+            x, y = nearestPoint(state.getPacmanPosition())
+            planes[statePlanes.PACMAN, x, y] = 1
+            for ghostState in state.getGhostStates():
+                x, y = nearestPoint(ghostState.getPosition())
+                planes[statePlanes.SCARED_GHOSTS if ghostState.scaredTimer else statePlanes.GHOSTS, x, y] = 1
+    number = len(states)
+    report('originalClassic: asList loops, per state', bestTime(loops), number)
+    for useNumpy in [True, False]:
+        extractor = statePlanes.StatePlanes(theLayout, useNumpy=useNumpy)
+        name = 'StatePlanes%s' % ('' if useNumpy else ' (array fallback)')
+        report('originalClassic: %s.extract, per state' % name,
+               bestTime(lambda: [extractor.extract(state) for state in states]), number)
+        out = extractor.allocate(number)
+        report('originalClassic: %s.extractBatch, per state' % name,
+               bestTime(lambda: extractor.extractBatch(states, out)), number)
+
+def benchmarkSharedLayouts():
+    "What a worker spends getting a layout: loading the file, unpickling it, or attaching to it in shared memory."
+    import pickle
+    import sharedLayouts
+    for layoutName in ['mediumClassic', 'originalClassic', 'bigMaze']:
+        theLayout = layout.getLayout(layoutName)
+        key = layout.layoutRef(theLayout)
+        distances = theLayout.getDistances()
+        shared = sharedLayouts.publish(theLayout, distances=True)
+        pickled = pickle.dumps(theLayout)
+        def fresh(function):
+            "Runs function as a new worker would, with no cached tables."
+            def run():
+                layout.ACTION_TABLES_CACHE.pop(key, None)
+                layout.DISTANCE_CACHE.pop(key, None)
+                return function()
+            return run
+        def attach():
+            attached = sharedLayouts.attach(shared.name)
+            attached.getLayout().getDistances()
+            attached.close()
+        print('%s (%d cells, shared block: %d bytes)' % (layoutName, theLayout.width * theLayout.height, shared.memory.size))
+        report('getLayout (file) + getDistances', bestTime(fresh(lambda: layout.getLayout(layoutName).getDistances())))
+        report('pickle.loads + getDistances', bestTime(fresh(lambda: pickle.loads(pickled).getDistances())))
+        report('pickle.loads, no distances', bestTime(fresh(lambda: pickle.loads(pickled))))
+        report('sharedLayouts.attach + getLayout + getDistances', bestTime(fresh(attach)))
+        shared.unlink()
+        layout.DISTANCE_CACHE[key] = distances
+
+def benchmarkStateBytes():
+    "GameState.toBytes/fromBytes against pickling, size and round-trip time."
+    import pickle
+    import random
+    for layoutName, numGhosts in [('smallClassic', 2), ('originalClassic', 4)]:
+        state = startState(layoutName, numGhosts)
+        random.seed(0)
+        numMoves = 0
+        while numMoves < 100 and not (state.isWin() or state.isLose()):
+            agentIndex = numMoves % state.getNumAgents()
+            state = state.generateSuccessor(agentIndex, random.choice(state.getLegalActions(agentIndex)))
+            numMoves += 1
+        ref = layout.registerLayout(state.data.layout)
+        data, pickled = state.toBytes(), pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+        print('%s after %d moves (toBytes: %d bytes, pickle: %d bytes)' % (layoutName, numMoves, len(data), len(pickled)))
+        report('pickle round trip', bestTime(lambda: pickle.loads(pickle.dumps(state, pickle.HIGHEST_PROTOCOL)), number=100), 100)
+        report('toBytes/fromBytes round trip', bestTime(lambda: pacman.GameState.fromBytes(ref, state.toBytes()), number=100), 100)
+        report('toBytes', bestTime(state.toBytes, number=100), 100)
+        report('fromBytes', bestTime(lambda: pacman.GameState.fromBytes(ref, data), number=100), 100)
+
+def benchmarkSuccessors():
+    "GameState.generateSuccessor for every legal action along a played game."
+    import random
+    for layoutName in ['smallClassic', 'originalClassic']:
+        state = startState(layoutName, 4)
+        states = []
+        random.seed(0)
+        while len(states) < 200 and not (state.isWin() or state.isLose()):
+            for agentIndex in range(state.getNumAgents()):
+                if state.isWin() or state.isLose(): break
+                states.append((state, agentIndex, state.getLegalActions(agentIndex)))
+                state = state.generateSuccessor(agentIndex, random.choice(states[-1][2]))
+        number = sum(len(actions) for s, agentIndex, actions in states)
+        def expand():
+            for s, agentIndex, actions in states:
+                for action in actions:
+                    s.generateSuccessor(agentIndex, action)
+        report('%s: generateSuccessor (%d calls)' % (layoutName, number), bestTime(expand), number)
+
+def checkVectorEnv(seeds=(0, 1, 2, 3), numSteps=300, workerCounts=(0, 1, 2, 4)):
+    """
+    Checks that a VectorEnv reset with seeds plays, for any number of
+    workers, the same games (the first ones and those that follow) as
+    single AutoResetEnvs reset with the same seeds, Pacman's actions being
+    drawn from a stream of each environment's own.  The random module is
+    used between steps, which must not change the games either.  Returns
+    the number of games that ended.
+    """
+    import random
+    import ghostAgents
+    import pacmanEnv
+    theLayout = layout.getLayout('smallClassic')
+    makeEnv = lambda: pacmanEnv.PacmanEnv(theLayout, [ghostAgents.RandomGhost(i + 1) for i in range(2)])
+    startEnv = makeEnv()
+    startEnv.reset()
+    startActions = startEnv.legalActions()
+
+    expected = []
+    for seed in seeds:
+        env = pacmanEnv.AutoResetEnv(makeEnv())
+        pacmanRandom = random.Random(seed)
+        history = [env.reset(seed)]
+        legal = startActions
+        for i in range(numSteps):
+            random.random()
+            observation, reward, done, info = env.step(pacmanRandom.choice(legal))
+            legal = info['legalActions']
+            history.append((observation, reward, done))
+        expected.append(history)
+
+    for workers in workerCounts:
+        envs = pacmanEnv.VectorEnv(makeEnv, len(seeds), workers)
+        try:
+            pacmanRandoms = [random.Random(seed) for seed in seeds]
+            histories = [[observation] for observation in envs.reset(list(seeds))]
+            legal = [startActions] * len(seeds)
+            for i in range(numSteps):
+                random.random()
+                actions = [pacmanRandom.choice(actions) for pacmanRandom, actions in zip(pacmanRandoms, legal)]
+                observations, rewards, dones, infos = envs.step(actions)
+                for history, observation, reward, done in zip(histories, observations, rewards, dones):
+                    history.append((observation, reward, done))
+                legal = [info['legalActions'] for info in infos]
+        finally:
+            envs.close()
+        if histories != expected:
+            raise Exception('VectorEnv with %d workers plays other games than single environments' % workers)
+    return sum(done for history in expected for observation, reward, done in history[1:])
+
+def benchmarkEnv():
+    "PacmanEnv reset and step on smallClassic, random Pacman against RandomGhosts (checked first)."
+    import random
+    import ghostAgents
+    import pacmanEnv
+    print('checked VectorEnv against single environments, over %d games' % checkVectorEnv())
+    env = pacmanEnv.PacmanEnv(layout.getLayout('smallClassic'), [ghostAgents.RandomGhost(i + 1) for i in range(2)])
+    report('reset, per 1000 calls', bestTime(env.reset, number=1000), 1)
+    steps = [0]
+    def play():
+        random.seed(0)
+        for i in range(100):
+            env.reset()
+            done, legal = False, env.legalActions()
+            while not done:
+                observation, reward, done, info = env.step(random.choice(legal))
+                legal = info['legalActions']
+                steps[0] += 1
+    steps[0] = 0
+    seconds = bestTime(play, repeat=1)
+    report('step (%d steps in 100 games)' % steps[0], seconds, steps[0])
+
+def benchmarkGames():
+    "Full headless games on originalClassic, GreedyAgent against DirectionalGhosts."
+    import random
+    import ghostAgents
+    import pacmanAgents
+    import textDisplay
+    theLayout = layout.getLayout('originalClassic')
+    seeds = range(4)
+    moves = []
+    def play():
+        del moves[:]
+        for seed in seeds:
+            random.seed(seed)
+            rules = pacman.ClassicGameRules()
+            ghosts = [ghostAgents.DirectionalGhost(i + 1) for i in range(4)]
+            g = rules.newGame(theLayout, pacmanAgents.GreedyAgent(), ghosts, textDisplay.NullGraphics(), True)
+            g.run()
+            moves.append(len(g.moveHistory))
+    start = startState('originalClassic', 4)
+    dots = start.getFood().asList() + start.getCapsules()
+    def eatAll():
+        state = pacman.GameState(start)
+        for position in dots:
+            pacman.PacmanRules.consume(position, state)
+    report('originalClassic: consume every dot and capsule', bestTime(eatAll, number=20), 20)
+    seconds = bestTime(play, repeat=3)
+    report('originalClassic: %d games' % len(seeds), seconds, len(seeds))
+    report('originalClassic: per move (%d moves)' % sum(moves), seconds, sum(moves))
+
+def benchmarkLegalActions():
+    "GameState.getLegalActions for every agent along a played game."
+    import random
+    state = startState('originalClassic', 4)
+    states = []
+    random.seed(0)
+    while len(states) < 500 and not (state.isWin() or state.isLose()):
+        agentIndex = len(states) % state.getNumAgents()
+        states.append(state)
+        state = state.generateSuccessor(agentIndex, random.choice(state.getLegalActions(agentIndex)))
+    agents = range(states[0].getNumAgents())
+    def legalActions():
+        for s in states:
+            for agentIndex in agents:
+                s.getLegalActions(agentIndex)
+    number = len(states) * len(agents)
+    report('originalClassic: getLegalActions, per 1000 calls', bestTime(legalActions, repeat=20), number / 1000.0)
+
+def stateSignature(state):
+    "Everything a move can change in a state, for comparing states exactly."
+    data = state.data
+    return ([(agentState.configuration.pos, agentState.configuration.direction, agentState.scaredTimer,
+              agentState.isPacman, agentState.start) for agentState in data.agentStates],
+            data.food.asList(), hash(data.food), data.getNumFood(), list(data.capsules), data.score,
+            data.scoreChange, list(data._eaten), data._win, data._lose, data._agentMoved, data._foodEaten,
+            data._capsuleEaten, hash(state))
+
+def checkMoves(layoutNames=('smallClassic', 'capsuleClassic', 'powerClassic', 'trickyClassic'), numGames=3, depth=3):
+    """
+    Checks applyMove/undoMove against generateSuccessor: from every state of
+    random games, walks the game tree depth moves deep, and compares the
+    whole state after each applyMove with the successor generateSuccessor
+    builds, and after each undoMove with the state before the move.  A
+    successor built in the middle of the walk must not change either.
+    Returns the number of moves checked.
+    """
+    import random
+    checked = [0]
+    def walk(state, agentIndex, depth, successors):
+        if depth == 0 or state.isWin() or state.isLose(): return
+        before = stateSignature(state)
+        nextAgent = (agentIndex + 1) % state.getNumAgents()
+        for action in state.getLegalActions(agentIndex):
+            successor = state.generateSuccessor(agentIndex, action)
+            expected = stateSignature(successor)
+            undo = state.applyMove(agentIndex, action)
+            if stateSignature(state) != expected:
+                raise Exception('applyMove(%d, %s) disagrees with generateSuccessor' % (agentIndex, action))
+            for other, otherExpected in successors:
+                if stateSignature(other) != otherExpected:
+                    raise Exception('applyMove changed a successor built earlier in the walk')
+            successors.append((successor, expected))
+            walk(state, nextAgent, depth - 1, successors)
+            successors.pop()
+            state.undoMove(undo)
+            if stateSignature(state) != before:
+                raise Exception('undoMove(applyMove(%d, %s)) does not restore the state' % (agentIndex, action))
+            if stateSignature(successor) != expected:
+                raise Exception('undoMove changed a successor built during the walk')
+            checked[0] += 1
+    for layoutName in layoutNames:
+        theLayout = layout.getLayout(layoutName)
+        for seed in range(numGames):
+            random.seed(seed)
+            state = pacman.GameState()
+            state.initialize(theLayout, theLayout.getNumGhosts())
+            agentIndex = 0
+            while not (state.isWin() or state.isLose()):
+                walk(state, agentIndex, depth, [])
+                state = state.generateSuccessor(agentIndex, random.choice(state.getLegalActions(agentIndex)))
+                agentIndex = (agentIndex + 1) % state.getNumAgents()
+    return checked[0]
+
+def benchmarkMoves():
+    "A depth-9 game tree walk with generateSuccessor and with applyMove/undoMove (checked first)."
+    print('checked applyMove/undoMove on %d moves' % checkMoves())
+    state = startState('mediumClassic', 2)
+    numAgents = state.getNumAgents()
+    def successors(state, agentIndex, depth):
+        if depth == 0 or state.isWin() or state.isLose(): return state.getScore()
+        return sum(successors(state.generateSuccessor(agentIndex, action), (agentIndex + 1) % numAgents, depth - 1)
+                   for action in state.getLegalActions(agentIndex))
+    def moves(state, agentIndex, depth):
+        if depth == 0 or state.isWin() or state.isLose(): return state.getScore()
+        total = 0
+        for action in state.getLegalActions(agentIndex):
+            undo = state.applyMove(agentIndex, action)
+            total += moves(state, (agentIndex + 1) % numAgents, depth - 1)
+            state.undoMove(undo)
+        return total
+    report('mediumClassic: depth 9, generateSuccessor', bestTime(lambda: successors(state, 0, 9), repeat=3))
+    report('mediumClassic: depth 9, applyMove/undoMove', bestTime(lambda: moves(state, 0, 9), repeat=3))
+
+def benchmarkRecords():
+    "Compact game records against pickled ones: size, writing, reading and seeking."
+    import io
+    import pickle
+    import random
+    import gameRecords
+    theLayout = layout.getLayout('originalClassic')
+    state = startState('originalClassic', 4)
+    random.seed(0)
+    moves, states = [], [state]
+    while not (state.isWin() or state.isLose()):
+        agentIndex = len(moves) % state.getNumAgents()
+        action = random.choice(state.getLegalActions(agentIndex))
+        state = state.generateSuccessor(agentIndex, action)
+        moves.append((agentIndex, action))
+        states.append(state)
+    pickled = pickle.dumps({'layout': theLayout, 'actions': moves})
+    def write():
+        out = io.BytesIO()
+        writer = gameRecords.RecordWriter(out, theLayout, 5)
+        for (agentIndex, action), state in zip(moves, states[1:]):
+            writer.recordMove(agentIndex, action, state)
+        return out.getvalue()
+    data = write()
+    print('originalClassic, %d moves (pickle: %d bytes, compact: %d bytes)' % (len(moves), len(pickled), len(data)))
+    report('RecordWriter.recordMove, per move', bestTime(write), len(moves))
+    report('pickle.loads', bestTime(lambda: pickle.loads(pickled)))
+    report('RecordReader', bestTime(lambda: gameRecords.RecordReader(io.BytesIO(data))))
+    reader = gameRecords.RecordReader(io.BytesIO(data))
+    def replayTo(numMoves):
+        state = startState('originalClassic', 4)
+        for agentIndex, action in moves[:numMoves]:
+            state = state.generateSuccessor(agentIndex, action)
+    last = len(moves) - 1
+    report('state after the last move, replaying from the start', bestTime(lambda: replayTo(last)))
+    report('state after the last move, RecordReader.seek', bestTime(lambda: reader.seek(last)))
+
+BENCHMARKS = {
+    'agentStates': benchmarkAgentStates,
+    'batch': benchmarkBatch,
+    'costGrid': benchmarkCostGrid,
+    'env': benchmarkEnv,
+    'games': benchmarkGames,
+    'grid': benchmarkGrid,
+    'hashing': benchmarkHashing,
+    'legalActions': benchmarkLegalActions,
+    'moves': benchmarkMoves,
+    'packBits': benchmarkPackBits,
+    'planes': benchmarkPlanes,
+    'records': benchmarkRecords,
+    'sharedLayouts': benchmarkSharedLayouts,
+    'stateBytes': benchmarkStateBytes,
+    'successors': benchmarkSuccessors,
+}
+
+if __name__ == '__main__':
+    names = sys.argv[1:]
+    if not names:
+        print('Benchmarks:')
+        for name in sorted(BENCHMARKS):
+            print('  %-16s %s' % (name, BENCHMARKS[name].__doc__))
+    for name in names:
+        if name not in BENCHMARKS:
+            raise Exception('Unknown benchmark: ' + name)
+        print('### %s' % name)
+        BENCHMARKS[name]()
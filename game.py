@@ -21,6 +21,10 @@
 # For more info, see http://inst.eecs.berkeley.edu/~cs188/sp09/pacman.html
 
 from util import *
+from itertools import chain, compress
+import random
+import signal
+import struct
 import time, os
 import traceback
 import sys
@@ -67,6 +71,12 @@ class Directions:
                WEST: EAST,
                STOP: STOP}
 
+# The directions numbered, in the order of Actions.getPossibleActions.  Game
+# records, GameState.toBytes and shared layouts store these numbers, so the
+# order must never change.
+DIRECTIONS = (Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP)
+DIRECTION_NUMBERS = dict((direction, i) for i, direction in enumerate(DIRECTIONS))
+
 class Configuration:
     """
     A Configuration holds the (x,y) coordinate of a character, along with its
@@ -74,7 +84,11 @@ class Configuration:
 
     The convention for positions, like a graph, is that (0,0) is the lower left corner, x increases
     horizontally and y increases vertically.  Therefore, north is the direction of increasing y, or (0,1).
+
+    Configurations are shared between game states, so they are never changed
+    once built: moving makes a new one (see generateSuccessor).
     """
+    __slots__ = ('pos', 'direction')
 
     def __init__(self, pos, direction):
         self.pos = pos
@@ -120,7 +134,11 @@ class Configuration:
 class AgentState:
     """
     AgentStates hold the state of an agent (configuration, speed, scared, etc).
+
+    AgentStates are shared between a game state and its successors until one
+    of them changes (see GameStateData.mutableAgentState).
     """
+    __slots__ = ('start', 'configuration', 'isPacman', 'scaredTimer', 'numCarrying', 'numReturned')
 
     def __init__( self, startConfiguration, isPacman ):
         self.start = startConfiguration
@@ -145,7 +163,9 @@ class AgentState:
         return hash(hash(self.configuration) + 13 * hash(self.scaredTimer))
 
     def copy( self ):
-        state = AgentState( self.start, self.isPacman )
+        state = AgentState.__new__( AgentState )
+        state.start = self.start
+        state.isPacman = self.isPacman
         state.configuration = self.configuration
         state.scaredTimer = self.scaredTimer
         state.numCarrying = self.numCarrying
@@ -159,6 +179,23 @@ class AgentState:
     def getDirection(self):
         return self.configuration.getDirection()
 
+# (width, height) -> Zobrist table, see zobristTable
+_ZOBRIST_TABLES = {}
+
+def zobristTable(width, height):
+    """
+    Returns the Zobrist table of grids of the given size: one random 64 bit
+    number per cell, indexed by x * height + y.  Grid hashes are the XOR of
+    the numbers of their True cells.  Tables are seeded by the grid size, so
+    hashes agree across runs and processes.
+    """
+    table = _ZOBRIST_TABLES.get((width, height))
+    if table is None:
+        rng = random.Random('zobrist %d %d' % (width, height))
+        table = [rng.getrandbits(64) for i in range(width * height)]
+        _ZOBRIST_TABLES[(width, height)] = table
+    return table
+
 class Grid:
     """
     A 2-dimensional array of objects backed by a list of lists.  Data is accessed
@@ -166,14 +203,22 @@ class Grid:
     y vertical and the origin (0,0) in the bottom left corner.
 
     The __str__ method constructs an output that is oriented like a pacman board.
+
+    Hashes are Zobrist hashes, computed on first use and then cached.  Cells
+    of a grid that may already have been hashed must be changed with setCell,
+    which keeps the cached hash up to date in O(1); writing grid[x][y]
+    directly is only safe on fresh copies.
     """
+    # Cached Zobrist hash, or None
+    _hash = None
+
     def __init__(self, width, height, initialValue=False, bitRepresentation=None):
         if initialValue not in [False, True]: raise Exception('Grids can only contain booleans')
         self.CELLS_PER_INT = 30
 
         self.width = width
         self.height = height
-        self.data = [[initialValue for y in range(height)] for x in range(width)]
+        self.data = [[initialValue] * height for x in range(width)]
         if bitRepresentation:
             self._unpackBits(bitRepresentation)
 
@@ -182,6 +227,17 @@ class Grid:
 
     def __setitem__(self, key, item):
         self.data[key] = item
+        self._hash = None
+
+    def setCell(self, x, y, value):
+        """
+        Sets cell (x,y) to value, updating the cached hash (if any) in O(1).
+        """
+        column = self[x]
+        if bool(column[y]) != bool(value):
+            column[y] = value
+            if self._hash is not None:
+                self._hash ^= zobristTable(self.width, self.height)[x * self.height + y]
 
     def __str__(self):
         out = [[str(self.data[x][y])[0] for x in range(self.width)] for y in range(self.height)]
@@ -190,22 +246,28 @@ class Grid:
 
     def __eq__(self, other):
         if other == None: return False
+        otherHash = getattr(other, '_hash', None)
+        if self._hash is not None and otherHash is not None and self._hash != otherHash: return False
         return self.data == other.data
 
     def __hash__(self):
-        # return hash(str(self))
-        base = 1
-        h = 0
-        for l in self.data:
-            for i in l:
-                if i:
-                    h += base
-                base *= 2
-        return hash(h)
-
-    def copy(self):
+        h = self._hash
+        if h is None:
+            table, height = zobristTable(self.width, self.height), self.height
+            h = 0
+            for x, y in self.asList():
+                h ^= table[x * height + y]
+            self._hash = h
+        return h
+
+    def copy(self, keepHash=False):
+        """
+        Returns a copy of the grid.  With keepHash, the copy inherits the
+        cached hash, and its cells must then only be changed with setCell.
+        """
         g = Grid(self.width, self.height)
         g.data = [x[:] for x in self.data]
+        if keepHash: g._hash = self._hash
         return g
 
     def deepCopy(self):
@@ -214,6 +276,7 @@ class Grid:
     def shallowCopy(self):
         g = Grid(self.width, self.height)
         g.data = self.data
+        g._hash = self._hash
         return g
 
     def count(self, item =True ):
@@ -231,20 +294,38 @@ class Grid:
         Returns an efficient int list representation
 
         (width, height, bitPackedInts...)
+
+        Each int holds CELLS_PER_INT cells, most significant bit first, in
+        cell index order (see _cellIndexToPosition).
         """
+        size = self.CELLS_PER_INT
+        numInts = self.width * self.height // size + 1
+        digits = self._cellBytes().translate(_BIT_DIGITS).ljust(numInts * size, b'0')
         bits = [self.width, self.height]
-        currentInt = 0
-        for i in range(self.height * self.width):
-            bit = self.CELLS_PER_INT - (i % self.CELLS_PER_INT) - 1
-            x, y = self._cellIndexToPosition(i)
-            if self[x][y]:
-                currentInt += 2 ** bit
-            if (i + 1) % self.CELLS_PER_INT == 0:
-                bits.append(currentInt)
-                currentInt = 0
-        bits.append(currentInt)
+        bits.extend([int(digits[i:i + size], 2) for i in range(0, numInts * size, size)])
         return tuple(bits)
 
+    def toBytes(self):
+        """
+        Returns a compact binary representation of the grid: width and
+        height as two big-endian 16 bit numbers, then one bit per cell in
+        cell index order, padded to a whole byte.  See gridFromBytes.
+        """
+        numCells = self.width * self.height
+        numBytes = (numCells + 7) // 8
+        digits = self._cellBytes().translate(_BIT_DIGITS).ljust(numBytes * 8, b'0')
+        return struct.pack('>HH', self.width, self.height) + int(digits or b'0', 2).to_bytes(numBytes, 'big')
+
+    def _cellBytes(self):
+        "Returns the cells as bytes of 0 and 1, in cell index order."
+        return bytes(chain.from_iterable(self.data))
+
+    def _setCellBytes(self, cells):
+        "Sets the cells from bytes of 0 and 1 in cell index order."
+        height = self.height
+        self.data = [list(map(bool, cells[x * height:(x + 1) * height])) for x in range(self.width)]
+        self._hash = None
+
     def _cellIndexToPosition(self, index):
         x = index // self.height
         y = index % self.height
@@ -254,13 +335,16 @@ class Grid:
         """
         Fills in data from a bit-level representation
         """
-        cell = 0
+        size = self.CELLS_PER_INT
         for packed in bits:
-            for bit in self._unpackInt(packed, self.CELLS_PER_INT):
-                if cell == self.width * self.height: break
-                x, y = self._cellIndexToPosition(cell)
-                self[x][y] = bit
-                cell += 1
+            if packed < 0: raise ValueError("must be a positive integer")
+        numCells = self.width * self.height
+        digits = ''.join([format(packed, '0%db' % size) for packed in bits])[:numCells]
+        cells = digits.encode('ascii').translate(_DIGIT_BITS)
+        if len(cells) < numCells:
+            # Too few ints: the remaining cells keep their values
+            cells = cells + self._cellBytes()[len(cells):]
+        self._setCellBytes(cells)
 
     def _unpackInt(self, packed, size):
         bools = []
@@ -274,6 +358,189 @@ class Grid:
                 bools.append(False)
         return bools
 
+def gridFromBytes(data, gridClass=Grid):
+    """
+    Rebuilds a grid from the output of Grid.toBytes.
+    """
+    grid, end = _gridFromBytes(data, 0, gridClass)
+    return grid
+
+def _gridFromBytes(data, offset, gridClass):
+    "Reads a grid from data at offset; returns it and the offset after it."
+    width, height = struct.unpack_from('>HH', data, offset)
+    numCells = width * height
+    numBytes = (numCells + 7) // 8
+    start = offset + 4
+    value = int.from_bytes(data[start:start + numBytes], 'big')
+    digits = format(value, '0%db' % (numBytes * 8))[:numCells] if numBytes else ''
+    grid = gridClass(width, height)
+    grid._setCellBytes(digits.encode('ascii').translate(_DIGIT_BITS))
+    return grid, start + numBytes
+
+def packGrids(grids):
+    """
+    Serialises a sequence of grids (of any sizes) into one bytes object: the
+    number of grids as a big-endian 32 bit number, then each grid's toBytes.
+    """
+    return struct.pack('>I', len(grids)) + b''.join([grid.toBytes() for grid in grids])
+
+def unpackGrids(data, gridClass=Grid):
+    """
+    Returns the list of grids serialised by packGrids.
+    """
+    count, = struct.unpack_from('>I', data, 0)
+    offset = 4
+    grids = []
+    for i in range(count):
+        grid, offset = _gridFromBytes(data, offset, gridClass)
+        grids.append(grid)
+    return grids
+
+def bitsToBytes(bits):
+    """
+    Packs bytes of 0 and 1 (such as the cells of a grid) into bits, the
+    first one in the most significant bit, padded to a whole byte.
+    """
+    numBytes = (len(bits) + 7) // 8
+    digits = bits.translate(_BIT_DIGITS).ljust(numBytes * 8, b'0')
+    return int(digits or b'0', 2).to_bytes(numBytes, 'big')
+
+def bytesToBits(data, numBits):
+    "Returns the first numBits bits of data as bytes of 0 and 1 (see bitsToBytes)."
+    digits = format(int.from_bytes(data, 'big'), '0%db' % (len(data) * 8))[:numBits] if data else ''
+    return digits.encode('ascii').translate(_DIGIT_BITS)
+
+def writeVarint(out, n):
+    "Appends the non-negative integer n to the bytearray out, 7 bits per byte."
+    while n > 0x7f:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+
+def readVarint(data, offset):
+    "Returns the varint at data[offset:] and the offset after it."
+    n = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        n |= (byte & 0x7f) << shift
+        if byte < 0x80: return n, offset
+        shift += 7
+
+# Maps the 0/1 cell bytes of a grid to binary digits, and back
+_BIT_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+_DIGIT_BITS = bytes.maketrans(b'01', b'\x00\x01')
+# Swaps the 0/1 cell bytes of a ByteGrid
+_BIT_INVERT = bytes.maketrans(b'\x00\x01', b'\x01\x00')
+# (width, height) -> list of the (x,y) position of every cell index
+_CELL_POSITIONS = {}
+
+class ByteGrid(Grid):
+    """
+    A Grid backed by one flat bytearray, one byte per cell, in the x-major
+    order of packBits (cell (x,y) is at index x * height + y).
+
+    grid[x][y] still works, through memoryview column views, but reads
+    return 1/0 rather than True/False.  copy, count, asList, equality and
+    hashing run over the whole bytearray at C speed.  Hashes are the same
+    Zobrist hashes as Grid's.
+    """
+    def __init__(self, width, height, initialValue=False, bitRepresentation=None):
+        if initialValue not in [False, True]: raise Exception('Grids can only contain booleans')
+        self.CELLS_PER_INT = 30
+
+        self.width = width
+        self.height = height
+        self.cells = bytearray([initialValue]) * (width * height)
+        self._makeColumns()
+        if bitRepresentation:
+            self._unpackBits(bitRepresentation)
+
+    def _makeColumns(self):
+        view, height = memoryview(self.cells), self.height
+        self.columns = [view[x * height:(x + 1) * height] for x in range(self.width)]
+
+    def __getitem__(self, i):
+        return self.columns[i]
+
+    def __setitem__(self, key, item):
+        self.columns[key][:] = bytearray(map(bool, item))
+        self._hash = None
+
+    def _cellBytes(self):
+        return bytes(self.cells)
+
+    def _setCellBytes(self, cells):
+        self.cells[:] = cells
+        self._hash = None
+
+    def __getstate__(self):
+        # memoryviews cannot be pickled; rebuild the columns on load
+        state = self.__dict__.copy()
+        del state['columns']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._makeColumns()
+
+    @property
+    def data(self):
+        "The cells as a list of lists of booleans, like Grid.data (a copy)."
+        return [[bool(v) for v in column] for column in self.columns]
+
+    def __str__(self):
+        out = [[str(bool(self.cells[x * self.height + y]))[0] for x in range(self.width)] for y in range(self.height)]
+        out.reverse()
+        return '\n'.join([''.join(x) for x in out])
+
+    def __eq__(self, other):
+        if other == None: return False
+        otherHash = getattr(other, '_hash', None)
+        if self._hash is not None and otherHash is not None and self._hash != otherHash: return False
+        if isinstance(other, ByteGrid):
+            return self.height == other.height and self.cells == other.cells
+        return self.data == other.data
+
+    def __hash__(self):
+        h = self._hash
+        if h is None:
+            table = zobristTable(self.width, self.height)
+            h = 0
+            for value in compress(table, self.cells):
+                h ^= value
+            self._hash = h
+        return h
+
+    def copy(self, keepHash=False):
+        g = ByteGrid.__new__(ByteGrid)
+        g.CELLS_PER_INT = self.CELLS_PER_INT
+        g.width, g.height = self.width, self.height
+        g.cells = bytearray(self.cells)
+        g._makeColumns()
+        if keepHash: g._hash = self._hash
+        return g
+
+    def shallowCopy(self):
+        g = ByteGrid.__new__(ByteGrid)
+        g.CELLS_PER_INT = self.CELLS_PER_INT
+        g.width, g.height = self.width, self.height
+        g.cells, g.columns = self.cells, self.columns
+        g._hash = self._hash
+        return g
+
+    def count(self, item =True ):
+        return self.cells.count(1 if item else 0)
+
+    def asList(self, key = True):
+        positions = _CELL_POSITIONS.get((self.width, self.height))
+        if positions is None:
+            positions = [(x, y) for x in range(self.width) for y in range(self.height)]
+            _CELL_POSITIONS[(self.width, self.height)] = positions
+        if key:
+            return list(compress(positions, self.cells))
+        return list(compress(positions, self.cells.translate(_BIT_INVERT)))
+
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1,2)):
         return bitRep
@@ -370,19 +637,40 @@ class Actions:
 
 class GameStateData:
     """
-
+    A successor built from a predecessor shares its food grid, capsule list
+    and agent states with it (copy-on-write).  Code that changes any of them
+    in place must first get a private copy through mutableFood,
+    mutableCapsules or mutableAgentState; deepCopy gives a fully private
+    state.  Building a successor makes the predecessor give up its copies,
+    as they are now shared.
     """
+    # Food count and capsule set, valid while food and capsules are the
+    # objects they were computed from (see getNumFood and hasCapsule)
+    _numFood = _countedFood = None
+    _capsuleSet = _setCapsules = None
+
     def __init__( self, prevState = None ):
         """
         Generates a new data packet by copying information from its predecessor.
         """
         if prevState != None:
-            self.food = prevState.food.shallowCopy()
-            self.capsules = prevState.capsules[:]
-            self.agentStates = self.copyAgentStates( prevState.agentStates )
+            self.food = prevState.food
+            self.capsules = prevState.capsules
+            self.agentStates = prevState.agentStates[:]
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
+            self._numFood, self._countedFood = prevState._numFood, prevState._countedFood
+            self._capsuleSet, self._setCapsules = prevState._capsuleSet, prevState._setCapsules
+            prevState._ownsFood = prevState._ownsCapsules = False
+            prevState._ownedAgents.clear()
+        self._startMove()
+
+    def _startMove( self ):
+        "Marks food, capsules and agent states as shared and clears the move bookkeeping."
+        self._ownsFood = False
+        self._ownsCapsules = False
+        self._ownedAgents = set()
 
         self._foodEaten = None
         self._foodAdded = None
@@ -391,10 +679,135 @@ class GameStateData:
         self._lose = False
         self._win = False
         self.scoreChange = 0
+        self._hash = None
+
+    def saveMove( self, agentIndex ):
+        """
+        Prepares this state to be changed in place by a move of agent
+        agentIndex, and returns the undo record restoreMove needs.  The state
+        first gets private copies of its food and agent states (once, not at
+        every move), which the move then changes in place.  The record holds
+        what the move can change: the configurations and scared timers of
+        the agents it can affect (all of them for Pacman, who can eat a
+        capsule or a ghost, else just the ghost moving), the score and
+        scoreChange, the capsule list (which an eaten capsule replaces), the
+        food count, _eaten and the rest of the move bookkeeping.  The food
+        dot eaten, if any, is found in _foodEaten when the move is undone.
+        """
+        if not self._ownsFood: self.mutableFood()
+        agentStates = self.agentStates
+        if len(self._ownedAgents) < len(agentStates):
+            for index in range(len(agentStates)): self.mutableAgentState(index)
+        if agentIndex == 0:
+            agents = [(agentState.configuration, agentState.scaredTimer) for agentState in agentStates]
+        else:
+            agentState = agentStates[agentIndex]
+            agents = (agentState.configuration, agentState.scaredTimer)
+        undo = (agentIndex, agents, self.score, self.scoreChange, self._hash, self._eaten, self._agentMoved,
+                self._foodEaten, self._foodAdded, self._capsuleEaten, self.getNumFood(),
+                self.capsules, self._capsuleSet, self._setCapsules)
+        self._ownsCapsules = False
+        self._foodEaten = self._foodAdded = self._capsuleEaten = self._agentMoved = None
+        self._lose = self._win = False
+        self.scoreChange = 0
+        self._hash = None
+        return undo
+
+    def restoreMove( self, undo ):
+        "Puts the state back as saveMove found it, undoing the move made since."
+        if self._foodEaten is not None:
+            x, y = self._foodEaten
+            self.mutableFood().setCell(x, y, True)
+        (agentIndex, agents, self.score, self.scoreChange, self._hash, self._eaten, self._agentMoved,
+         self._foodEaten, self._foodAdded, self._capsuleEaten, self._numFood,
+         self.capsules, self._capsuleSet, self._setCapsules) = undo
+        self._countedFood = self.food
+        self._lose = self._win = False
+        self._ownsCapsules = False
+        if agentIndex == 0:
+            for index, (configuration, scaredTimer) in enumerate(agents):
+                self._restoreAgent(index, configuration, scaredTimer)
+        else:
+            self._restoreAgent(agentIndex, agents[0], agents[1])
+
+    def _restoreAgent( self, agentIndex, configuration, scaredTimer ):
+        agentState = self.agentStates[agentIndex]
+        if agentState.configuration is not configuration or agentState.scaredTimer != scaredTimer:
+            agentState = self.mutableAgentState(agentIndex)
+            agentState.configuration = configuration
+            agentState.scaredTimer = scaredTimer
+
+    def mutableFood( self ):
+        """
+        Returns the food grid, copying it first if it is shared with another
+        state.  Change its cells with setCell to keep its hash up to date.
+        """
+        if not self._ownsFood:
+            self.food = self.food.copy(keepHash=True)
+            self._ownsFood = True
+        return self.food
+
+    def mutableCapsules( self ):
+        """
+        Returns the capsule list, copying it first if it is shared with
+        another state.
+        """
+        if not self._ownsCapsules:
+            self.capsules = self.capsules[:]
+            self._ownsCapsules = True
+        return self.capsules
+
+    def getNumFood( self ):
+        """
+        Returns the number of food dots left.  The count is kept up to date
+        by eatFood, and recomputed only when food is replaced by another grid.
+        """
+        if self._countedFood is not self.food:
+            self._numFood = self.food.count()
+            self._countedFood = self.food
+        return self._numFood
+
+    def eatFood( self, x, y ):
+        """
+        Removes the food dot at (x, y), which must be there, and returns the
+        number of dots left.
+        """
+        numFood = self.getNumFood() - 1
+        self.mutableFood().setCell(x, y, False)
+        self._numFood, self._countedFood = numFood, self.food
+        return numFood
+
+    def hasCapsule( self, position ):
+        if self._setCapsules is not self.capsules:
+            self._capsuleSet = frozenset(self.capsules)
+            self._setCapsules = self.capsules
+        return position in self._capsuleSet
+
+    def eatCapsule( self, position ):
+        "Removes the capsule at position, which must be there."
+        self.hasCapsule(position)
+        self.mutableCapsules().remove(position)
+        self._capsuleSet, self._setCapsules = self._capsuleSet - {position}, self.capsules
+
+    def mutableAgentState( self, agentIndex ):
+        """
+        Returns the AgentState of agent agentIndex, copying it first if it is
+        shared with another state.
+        """
+        if agentIndex not in self._ownedAgents:
+            self.agentStates[agentIndex] = self.agentStates[agentIndex].copy()
+            self._ownedAgents.add(agentIndex)
+        return self.agentStates[agentIndex]
 
     def deepCopy( self ):
         state = GameStateData( self )
         state.food = self.food.deepCopy()
+        state.capsules = self.capsules[:]
+        state._numFood, state._countedFood = self.getNumFood(), state.food
+        state._capsuleSet, state._setCapsules = None, None
+        state.agentStates = self.copyAgentStates( self.agentStates )
+        state._ownsFood = state._ownsCapsules = True
+        state._ownedAgents = set(range(len(state.agentStates)))
         state.layout = self.layout.deepCopy()
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
@@ -423,14 +836,16 @@ class GameStateData:
     def __hash__( self ):
         """
         Allows states to be keys of dictionaries.
+
+        The hash is computed once and cached, so a state must not be changed
+        after it has been hashed.  The food grid's Zobrist hash is itself
+        cached and kept up to date as dots are eaten.
         """
-        for i, state in enumerate( self.agentStates ):
-            try:
-                int(hash(state))
-            except TypeError as e:
-                print(e)
-                #hash(state)
-        return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113* hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575 )
+        h = self._hash
+        if h is None:
+            h = int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113* hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575 )
+            self._hash = h
+        return h
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
@@ -503,6 +918,10 @@ class GameStateData:
                 else: numGhosts += 1
             self.agentStates.append( AgentState( Configuration( pos, Directions.STOP), isPacman) )
         self._eaten = [False for a in self.agentStates]
+        self._numFood, self._countedFood = None, None
+        self._capsuleSet, self._setCapsules = None, None
+        self._ownsFood = self._ownsCapsules = True
+        self._ownedAgents = set(range(len(self.agentStates)))
 
 try:
     import boinc
@@ -514,8 +933,13 @@ class Game:
     """
     The Game manages the control flow, soliciting actions from agents.
     """
+    # Told of each move as it is made, see gameRecords.RecordWriter
+    recorder = None
 
-    def __init__( self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False ):
+    def __init__( self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False, fast=False ):
+        """
+        With fast, run uses runFast, the lean loop for headless simulations.
+        """
         self.agentCrashed = False
         self.agents = agents
         self.display = display
@@ -524,6 +948,7 @@ class Game:
         self.gameOver = False
         self.muteAgents = muteAgents
         self.catchExceptions = catchExceptions
+        self.fast = fast
         self.moveHistory = []
         self.totalAgentTimes = [0 for agent in agents]
         self.totalAgentTimeWarnings = [0 for agent in agents]
@@ -568,6 +993,7 @@ class Game:
         """
         Main control loop for game play.
         """
+        if self.fast: return self.runFast()
         self.display.initialize(self.state.data)
         self.numMoves = 0
 
@@ -698,6 +1124,7 @@ class Game:
                     return
             else:
                 self.state = self.state.generateSuccessor( agentIndex, action )
+            if self.recorder is not None: self.recorder.recordMove( agentIndex, action, self.state )
 
             # Change the display
             self.display.update( self.state.data )
@@ -727,3 +1154,172 @@ class Game:
                     self.unmute()
                     return
         self.display.finish()
+
+    def runFast( self ):
+        """
+        A leaner control loop for headless simulations, with the same game
+        play as run:
+
+          - agent capabilities (observationFunction, final, ...) are looked
+            up once per game, not with dir() on every turn;
+          - agents get read-only snapshots of the state (state.snapshot(),
+            see GameState.snapshot) instead of deep copies;
+          - agent output is muted once for the whole game, into one buffer
+            shared by all agents;
+          - with catchExceptions, one SIGALRM handler is installed for the
+            whole game, and a timer is armed (signal.setitimer) for each
+            move, instead of a handler being installed at every call; where
+            there are no such signals, moves are only timed, and the time
+            limits checked once the move is made.
+        """
+        self.display.initialize(self.state.data)
+        self.numMoves = 0
+        agents = self.agents
+        for i, agent in enumerate(agents):
+            if not agent:
+                # this is a null agent, meaning it failed to load
+                # the other team wins
+                print("Agent %d failed to load" % i, file=sys.stderr)
+                self._agentCrash(i, quiet=True)
+                return
+        observationFunctions = [getattr(agent, 'observationFunction', None) for agent in agents]
+        getActions = [agent.getAction for agent in agents]
+        clock = time.perf_counter
+        rules = self.rules
+        oldAlarmHandler = self._startAlarm()
+        alarm = oldAlarmHandler is not None
+
+        if self.muteAgents:
+            import io
+            self.agentOutput = [io.StringIO()] * len(agents)
+            oldStdout, oldStderr = sys.stdout, sys.stderr
+            sys.stdout = sys.stderr = self.agentOutput[0]
+        try:
+            # inform learning agents of the game start
+            for i, agent in enumerate(agents):
+                registerInitialState = getattr(agent, 'registerInitialState', None)
+                if registerInitialState is None: continue
+                start = clock()
+                try:
+                    if alarm: signal.setitimer(signal.ITIMER_REAL, rules.getMaxStartupTime(i))
+                    registerInitialState(self.state.snapshot())
+                    if alarm: signal.setitimer(signal.ITIMER_REAL, 0)
+                except TimeoutFunctionException:
+                    print("Agent %d ran out of time on startup!" % i, file=sys.stderr)
+                    self.agentTimeout = True
+                    self._agentCrash(i, quiet=True)
+                    return
+                except Exception:
+                    if not self.catchExceptions: raise
+                    self._agentCrash(i)
+                    return
+                timeTaken = clock() - start
+                self.totalAgentTimes[i] += timeTaken
+                if self.catchExceptions and timeTaken > rules.getMaxStartupTime(i):
+                    print("Agent %d ran out of time on startup!" % i, file=sys.stderr)
+                    self.agentTimeout = True
+                    self._agentCrash(i, quiet=True)
+                    return
+
+            agentIndex = self.startingIndex
+            numAgents = len(agents)
+            while not self.gameOver:
+                # Solicit an action, from an observation of the state
+                start = clock()
+                try:
+                    if alarm: signal.setitimer(signal.ITIMER_REAL, rules.getMoveTimeout(agentIndex))
+                    observation = self.state.snapshot()
+                    if observationFunctions[agentIndex] is not None:
+                        observation = observationFunctions[agentIndex](observation)
+                    action = getActions[agentIndex](observation)
+                    if alarm: signal.setitimer(signal.ITIMER_REAL, 0)
+                except TimeoutFunctionException:
+                    print("Agent %d timed out on a single move!" % agentIndex, file=sys.stderr)
+                    self.agentTimeout = True
+                    self._agentCrash(agentIndex, quiet=True)
+                    return
+                except Exception:
+                    if not self.catchExceptions: raise
+                    self._agentCrash(agentIndex)
+                    return
+                moveTime = clock() - start
+                self.totalAgentTimes[agentIndex] += moveTime
+                if self.catchExceptions and not self._checkMoveTime(agentIndex, moveTime):
+                    return
+
+                # Execute the action
+                self.moveHistory.append( (agentIndex, action) )
+                try:
+                    self.state = self.state.generateSuccessor( agentIndex, action )
+                except Exception:
+                    if not self.catchExceptions: raise
+                    self._agentCrash(agentIndex)
+                    return
+                if self.recorder is not None: self.recorder.recordMove( agentIndex, action, self.state )
+
+                self.display.update( self.state.data )
+                rules.process(self.state, self)
+                agentIndex = ( agentIndex + 1 ) % numAgents
+
+                if _BOINC_ENABLED:
+                    boinc.set_fraction_done(self.getProgress())
+
+            # inform a learning agent of the game result
+            for agentIndex, agent in enumerate(agents):
+                final = getattr(agent, 'final', None)
+                if final is None: continue
+                try:
+                    final( self.state )
+                except Exception:
+                    if not self.catchExceptions: raise
+                    self._agentCrash(agentIndex)
+                    return
+        finally:
+            if alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, oldAlarmHandler)
+            if self.muteAgents:
+                sys.stdout, sys.stderr = oldStdout, oldStderr
+        self.display.finish()
+
+    def _startAlarm( self ):
+        """
+        With catchExceptions, installs a SIGALRM handler raising
+        TimeoutFunctionException for runFast, and returns the handler it
+        replaces; returns None where there are no such signals, or when
+        they can only be handled by another thread.
+        """
+        if not self.catchExceptions or not hasattr(signal, 'setitimer'): return None
+        def timeout(signum, frame):
+            raise TimeoutFunctionException()
+        try:
+            old = signal.signal(signal.SIGALRM, timeout)
+        except ValueError:
+            return None
+        if old is None: return signal.SIG_DFL
+        return old
+
+    def _checkMoveTime( self, agentIndex, moveTime ):
+        """
+        Applies the rules' time limits to a move that took moveTime seconds,
+        after the fact; returns False if the agent crashed for it.
+        """
+        if moveTime > self.rules.getMoveTimeout(agentIndex):
+            print("Agent %d timed out on a single move!" % agentIndex, file=sys.stderr)
+            self.agentTimeout = True
+            self._agentCrash(agentIndex, quiet=True)
+            return False
+        if moveTime > self.rules.getMoveWarningTime(agentIndex):
+            self.totalAgentTimeWarnings[agentIndex] += 1
+            print("Agent %d took too long to make a move! This is warning %d" % (agentIndex, self.totalAgentTimeWarnings[agentIndex]), file=sys.stderr)
+            if self.totalAgentTimeWarnings[agentIndex] > self.rules.getMaxTimeWarnings(agentIndex):
+                print("Agent %d exceeded the maximum number of warnings: %d" % (agentIndex, self.totalAgentTimeWarnings[agentIndex]), file=sys.stderr)
+                self.agentTimeout = True
+                self._agentCrash(agentIndex, quiet=True)
+                return False
+        if self.totalAgentTimes[agentIndex] > self.rules.getMaxTotalTime(agentIndex):
+            print("Agent %d ran out of time! (time: %1.2f)" % (agentIndex, self.totalAgentTimes[agentIndex]), file=sys.stderr)
+            self.agentTimeout = True
+            self._agentCrash(agentIndex, quiet=True)
+            return False
+        return True
@@ -0,0 +1,217 @@
+# gameRecords.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A compact binary format for recorded games, written move by move while the
+game is played (pacman.py -r --recordFormat compact).
+
+A record is a header, then a stream of entries:
+
+  header    MAGIC, the format VERSION (one byte), the layout's reference
+            (the 20 byte SHA-1 digest of its text, see layout.layoutRef), and
+            varints for the number of agents and the keyframe interval
+  move      a varint, 1 + agentIndex * len(ACTIONS) + the action's number
+  keyframe  a 0 byte, then varints for the number of moves made and the
+            length of the state, then the state (see GameState.toBytes)
+
+Most moves fit in a byte.  A keyframe follows every keyframeInterval moves,
+so RecordReader.seek rebuilds the state after any move by replaying at most
+keyframeInterval moves from the keyframe before it.  Layouts are not stored:
+readers find them by reference, in the layout registry or the layouts
+directory (see layout.getLayoutByRef).  A record cut short, by a crash for
+instance, reads as the game up to its last whole entry.
+"""
+
+from game import DIRECTIONS, DIRECTION_NUMBERS
+from game import readVarint, writeVarint
+import layout
+import pacman
+
+MAGIC = b'PACREC'
+# Version 1 keyframes lacked the number of agents GameState.toBytes starts with
+VERSION = 2
+KEYFRAME_INTERVAL = 64
+
+# Action numbers, in moves: those of game.DIRECTIONS
+ACTIONS = DIRECTIONS
+ACTION_NUMBERS = DIRECTION_NUMBERS
+
+class RecordWriter:
+    """
+    Writes the record of a game to a file (a name, or a binary file object)
+    as it is played: recordMove after each move, then close.  Game.run does
+    the recordMove calls for a Game whose recorder is a RecordWriter.
+    """
+    def __init__(self, file, theLayout, numAgents, keyframeInterval=KEYFRAME_INTERVAL):
+        self.ownsFile = isinstance(file, str)
+        self.file = open(file, 'wb') if self.ownsFile else file
+        self.keyframeInterval = keyframeInterval
+        self.numMoves = 0
+        header = bytearray(MAGIC)
+        header.append(VERSION)
+        header += bytes.fromhex(layout.registerLayout(theLayout))
+        writeVarint(header, numAgents)
+        writeVarint(header, keyframeInterval)
+        self.file.write(header)
+
+    def recordMove(self, agentIndex, action, state):
+        "Records the move, given the state it led to."
+        out = bytearray()
+        writeVarint(out, 1 + agentIndex * len(ACTIONS) + ACTION_NUMBERS[action])
+        self.numMoves += 1
+        if self.numMoves % self.keyframeInterval == 0:
+            keyframe = state.toBytes()
+            out.append(0)
+            writeVarint(out, self.numMoves)
+            writeVarint(out, len(keyframe))
+            out += keyframe
+        self.file.write(out)
+        # Whole keyframes reach the file, so a crash leaves a readable record
+        if self.numMoves % self.keyframeInterval == 0: self.file.flush()
+
+    def close(self):
+        if self.ownsFile: self.file.close()
+        else: self.file.flush()
+
+def writeRecord(file, theLayout, numAgents, moveHistory, keyframeInterval=KEYFRAME_INTERVAL):
+    """
+    Writes the record of a finished game, replaying its moves to build the
+    keyframes.  Moves past the end of the game, or illegal ones (from an
+    agent that crashed), are left out.
+    """
+    writer = RecordWriter(file, theLayout, numAgents, keyframeInterval)
+    state = pacman.GameState()
+    state.initialize(theLayout, numAgents - 1)
+    try:
+        for agentIndex, action in moveHistory:
+            if state.isWin() or state.isLose(): break
+            try:
+                state = state.generateSuccessor(agentIndex, action)
+            except Exception:
+                break
+            writer.recordMove(agentIndex, action, state)
+    finally:
+        writer.close()
+
+def isRecord(fileName):
+    "Whether the file is a record in this format (as opposed to a pickle)."
+    f = open(fileName, 'rb')
+    try: return f.read(len(MAGIC)) == MAGIC
+    finally: f.close()
+
+class RecordReader:
+    """
+    Reads a record.  The file (a name or a binary file object) is read once,
+    and its entries are indexed: the moves are streamed by moves and states,
+    and seek(n) returns the state after move n from the nearest keyframe.
+    theLayout, if given, is used instead of looking the layout up.
+    """
+    def __init__(self, file, theLayout=None):
+        if isinstance(file, str):
+            f = open(file, 'rb')
+            try: data = f.read()
+            finally: f.close()
+        else:
+            data = file.read()
+        if data[:len(MAGIC)] != MAGIC: raise Exception('Not a game record')
+        self.version = data[len(MAGIC)]
+        if self.version not in (1, VERSION): raise Exception('Unknown game record version %d' % self.version)
+        offset = len(MAGIC) + 1
+        self.layoutRef = data[offset:offset + 20].hex()
+        self.numAgents, offset = readVarint(data, offset + 20)
+        self.keyframeInterval, offset = readVarint(data, offset)
+        self.layout = theLayout or layout.getLayoutByRef(self.layoutRef)
+        if self.layout is None: raise Exception('Unknown layout %s' % self.layoutRef)
+        self.data = data
+        self._index(offset)
+
+    def _index(self, offset):
+        """
+        Finds the offsets of the moves and keyframes.  moveOffsets[i] is the
+        offset of move i (and moveOffsets[len(self)] the end of the last whole
+        entry); keyframes maps a move number to the offset and length of its
+        state.
+        """
+        data, end = self.data, len(self.data)
+        self.moveOffsets = []
+        self.keyframes = {}
+        try:
+            while offset < end:
+                if data[offset]:
+                    self.moveOffsets.append(offset)
+                    offset = readVarint(data, offset)[1]
+                    continue
+                numMoves, start = readVarint(data, offset + 1)
+                length, start = readVarint(data, start)
+                if start + length > end: break
+                self.keyframes[numMoves] = (start, length)
+                offset = start + length
+        except IndexError:
+            # A varint cut short
+            if self.moveOffsets and self.moveOffsets[-1] == offset: self.moveOffsets.pop()
+        self.moveOffsets.append(offset)
+
+    def __len__(self):
+        "The number of moves."
+        return len(self.moveOffsets) - 1
+
+    def startState(self):
+        state = pacman.GameState()
+        state.initialize(self.layout, self.numAgents - 1)
+        return state
+
+    def moves(self, start=0):
+        "Yields the moves, as (agentIndex, action) pairs, from move start on."
+        data, numActions = self.data, len(ACTIONS)
+        for offset in self.moveOffsets[start:-1]:
+            code = readVarint(data, offset)[0] - 1
+            yield code // numActions, ACTIONS[code % numActions]
+
+    def getMoves(self):
+        "The list of moves, like Game.moveHistory."
+        return list(self.moves())
+
+    def keyframe(self, numMoves):
+        "The state after numMoves moves, if there is a keyframe for it, else None."
+        if numMoves not in self.keyframes: return None
+        start, length = self.keyframes[numMoves]
+        state = self.data[start:start + length]
+        # Version 1 keyframes leave out the number of agents
+        if self.version == 1: state = bytes([self.numAgents]) + state
+        return pacman.GameState.fromBytes(self.layout, state)
+
+    def seek(self, numMoves):
+        """
+        Returns the state after numMoves moves, replaying the moves after the
+        last keyframe before it.
+        """
+        if not 0 <= numMoves <= len(self): raise Exception('No move %d in a record of %d moves' % (numMoves, len(self)))
+        start = numMoves - numMoves % self.keyframeInterval
+        while start and start not in self.keyframes: start -= self.keyframeInterval
+        state = self.keyframe(start) if start else self.startState()
+        for agentIndex, action in self.moves(start):
+            if start == numMoves: break
+            state = state.generateSuccessor(agentIndex, action)
+            start += 1
+        return state
+
+    def states(self, start=0):
+        """
+        Yields (agentIndex, action, state) for each move from move start on,
+        state being the state the move led to.
+        """
+        state = self.seek(start)
+        for agentIndex, action in self.moves(start):
+            state = state.generateSuccessor(agentIndex, action)
+            yield agentIndex, action, state
@@ -580,6 +580,13 @@ class PacmanGraphics:
             if self.frameTime < 0:
                 refresh()
 
+    def expandedCellsObserver(self):
+        """
+        Returns a search observer that draws the cells a search expands once
+        it reaches its goal.
+        """
+        return ExpandedCellsObserver(self)
+
     def clearExpandedCells(self):
         if 'expandedCells' in dir(self) and len(self.expandedCells) > 0:
             for cell in self.expandedCells:
@@ -608,6 +615,26 @@ class PacmanGraphics:
                 changeColor(image, formatColor(*color))
         refresh()
 
+class ExpandedCellsObserver:
+    """
+    A search observer (see search.SearchObserver) that collects the
+    positions a search expands and hands them to drawExpandedCells when the
+    goal is reached.
+    """
+    def __init__(self, display):
+        self.display = display
+        self.cells = []
+
+    def onExpand(self, state):
+        self.cells.append(state)
+
+    def onGenerate(self, state, successors):
+        pass
+
+    def onGoal(self, state):
+        self.cells.append(state)
+        self.display.drawExpandedCells(self.cells)
+
 class FirstPersonPacmanGraphics(PacmanGraphics):
     def __init__(self, zoom = 1.0, showGhosts = True, capture = False, frameTime=0):
         PacmanGraphics.__init__(self, zoom, frameTime=frameTime)
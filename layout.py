@@ -14,28 +14,48 @@
 
 from util import manhattanDistance
 from game import Grid
+from game import Actions
+from game import Configuration
+from game import Directions
+from game import DIRECTIONS
+from array import array
+import hashlib
 import os
 import random
 from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
+ACTION_TABLES_CACHE = {}
+DISTANCE_CACHE = {}
+# The distance between cells that are not connected, see getDistances
+UNREACHABLE = 0xffff
+# layout reference -> Layout, see registerLayout
+LAYOUT_REGISTRY = {}
 
 class Layout:
     """
     A Layout manages the static information about the game board.
     """
+    # Layouts pickled before gridClass existed used Grid
+    gridClass = Grid
 
-    def __init__(self, layoutText):
+    def __init__(self, layoutText, gridClass=Grid):
+        """
+        gridClass is the Grid implementation used for walls and food, e.g.
+        game.ByteGrid.
+        """
         self.width = len(layoutText[0])
         self.height= len(layoutText)
-        self.walls = Grid(self.width, self.height, False)
-        self.food = Grid(self.width, self.height, False)
+        self.gridClass = gridClass
+        self.walls = gridClass(self.width, self.height, False)
+        self.food = gridClass(self.width, self.height, False)
         self.capsules = []
         self.agentPositions = []
         self.numGhosts = 0
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
+        self.legalActions, self.ghostActions = self.getActionTables()
         # self.initializeVisibilityMatrix()
 
     def getNumGhosts(self):
@@ -62,6 +82,92 @@ class Layout:
         else:
             self.visibility = VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)]
 
+    def getActionTables(self):
+        """
+        Returns the tables the game rules look legal actions up in, for an
+        agent standing on the grid point (x, y), at index x * height + y:
+
+          legalActions       the possible actions there, as a tuple
+          ghostActions[dir]  the actions a ghost heading dir may take there
+                             (no stopping, and no turning back unless it has to)
+
+        Wall cells, and open cells on the border, hold None.  The tables are
+        built once per layout text (see layoutRef) and shared by its copies.
+        """
+        key = layoutRef(self)
+        if key not in ACTION_TABLES_CACHE:
+            legalActions = []
+            ghostActions = dict((heading, []) for heading in DIRECTIONS)
+            for x in range(self.width):
+                for y in range(self.height):
+                    possible = None
+                    if not self.walls[x][y] and 0 < x < self.width - 1 and 0 < y < self.height - 1:
+                        possible = Actions.getPossibleActions(Configuration((x, y), Directions.STOP), self.walls)
+                    legalActions.append(None if possible is None else tuple(possible))
+                    for heading in DIRECTIONS:
+                        actions = None
+                        if possible is not None:
+                            actions = [action for action in possible if action != Directions.STOP]
+                            reverse = Actions.reverseDirection(heading)
+                            if reverse in actions and len(actions) > 1:
+                                actions.remove(reverse)
+                            actions = tuple(actions)
+                        ghostActions[heading].append(actions)
+            ACTION_TABLES_CACHE[key] = (legalActions, ghostActions)
+        return ACTION_TABLES_CACHE[key]
+
+    def getDistances(self):
+        """
+        Returns the maze distances between all cells, as a flat array of
+        unsigned shorts: the distance from cell a to cell b (cell x * height +
+        y) is at index a * width * height + b, and is UNREACHABLE if the two
+        are not connected, or either is a wall.  The distances are computed
+        once per layout text (see layoutRef), by a breadth-first search from
+        every cell.
+        """
+        key = layoutRef(self)
+        if key not in DISTANCE_CACHE:
+            height, numCells = self.height, self.width * self.height
+            neighbours = []
+            for index, actions in enumerate(self.legalActions):
+                x, y = divmod(index, height)
+                vectors = [Actions._directions[action] for action in actions or () if action != Directions.STOP]
+                neighbours.append([(x + dx) * height + y + dy for dx, dy in vectors])
+            distances = array('H', [UNREACHABLE]) * (numCells * numCells)
+            for source in range(numCells):
+                if self.walls[source // height][source % height]: continue
+                row = source * numCells
+                distances[row + source] = 0
+                frontier, distance = [source], 0
+                while frontier:
+                    distance += 1
+                    reached = []
+                    for cell in frontier:
+                        for neighbour in neighbours[cell]:
+                            if distances[row + neighbour] == UNREACHABLE:
+                                distances[row + neighbour] = distance
+                                reached.append(neighbour)
+                    frontier = reached
+            DISTANCE_CACHE[key] = distances
+        return DISTANCE_CACHE[key]
+
+    def getMazeDistance(self, pos1, pos2):
+        "The maze distance between two grid points, or None if they are not connected."
+        height, numCells = self.height, self.width * self.height
+        distance = self.getDistances()[(pos1[0] * height + pos1[1]) * numCells + pos2[0] * height + pos2[1]]
+        if distance == UNREACHABLE: return None
+        return distance
+
+    def __getstate__(self):
+        "The action tables are left out of pickles, and rebuilt on loading."
+        state = self.__dict__.copy()
+        del state['legalActions'], state['ghostActions']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.legalActions, self.ghostActions = self.getActionTables()
+
     def isWall(self, pos):
         x, col = pos
         return self.walls[x][col]
@@ -91,7 +197,7 @@ class Layout:
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        return Layout(self.layoutText[:], self.gridClass)
 
     def processLayoutText(self, layoutText):
         """
@@ -129,22 +235,51 @@ class Layout:
         elif layoutChar in  ['1', '2', '3', '4']:
             self.agentPositions.append( (int(layoutChar), (x,y)))
             self.numGhosts += 1
-def getLayout(name, back = 2):
+def layoutRef(layout):
+    """
+    Returns the reference of layout: the SHA-1 digest of its text, in hex,
+    the same for all copies of the layout and in every process.
+    """
+    ref = getattr(layout, '_ref', None)
+    if ref is None:
+        ref = layout._ref = hashlib.sha1("\n".join(layout.layoutText).encode()).hexdigest()
+    return ref
+
+def registerLayout(layout):
+    "Adds layout to the registry getLayoutByRef looks in, and returns its reference."
+    ref = layoutRef(layout)
+    LAYOUT_REGISTRY.setdefault(ref, layout)
+    return ref
+
+def getLayoutByRef(ref, layoutDir='layouts'):
+    """
+    Returns the registered layout with reference ref.  A layout that was not
+    registered is looked for among the .lay files of layoutDir (which are all
+    registered on the way).  Returns None if it cannot be found.
+    """
+    if ref not in LAYOUT_REGISTRY and os.path.isdir(layoutDir):
+        for name in sorted(os.listdir(layoutDir)):
+            if not name.endswith('.lay'): continue
+            layout = tryToLoad(os.path.join(layoutDir, name))
+            if layout is not None and registerLayout(layout) == ref: break
+    return LAYOUT_REGISTRY.get(ref)
+
+def getLayout(name, back = 2, gridClass=Grid):
     if name.endswith('.lay'):
-        layout = tryToLoad('layouts/' + name)
-        if layout == None: layout = tryToLoad(name)
+        layout = tryToLoad('layouts/' + name, gridClass)
+        if layout == None: layout = tryToLoad(name, gridClass)
     else:
-        layout = tryToLoad('layouts/' + name + '.lay')
-        if layout == None: layout = tryToLoad(name + '.lay')
+        layout = tryToLoad('layouts/' + name + '.lay', gridClass)
+        if layout == None: layout = tryToLoad(name + '.lay', gridClass)
     if layout == None and back >= 0:
         curdir = os.path.abspath('.')
         os.chdir('..')
-        layout = getLayout(name, back -1)
+        layout = getLayout(name, back -1, gridClass)
         os.chdir(curdir)
     return layout
 
-def tryToLoad(fullname):
+def tryToLoad(fullname, gridClass=Grid):
     if(not os.path.exists(fullname)): return None
     f = open(fullname)
-    try: return Layout([line.strip() for line in f])
+    try: return Layout([line.strip() for line in f], gridClass)
     finally: f.close()
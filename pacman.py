@@ -43,6 +43,11 @@ from game import GameStateData
 from game import Game
 from game import Directions
 from game import Actions
+from game import Configuration
+from game import DIRECTIONS, DIRECTION_NUMBERS
+from game import bitsToBytes, bytesToBits, readVarint, writeVarint
+from game import _BIT_INVERT
+from itertools import compress
 from util import nearestPoint
 from util import manhattanDistance
 import util, layout
@@ -52,6 +57,50 @@ import sys, types, time, random, os
 # YOUR INTERFACE TO THE PACMAN WORLD: A GameState #
 ###################################################
 
+class ExploredCounter:
+    """
+    An explored-state sink for GameState.trackExplored that only counts the
+    states added to it (with repetitions), without keeping or hashing them.
+    """
+    def __init__(self, count=0):
+        self.count = count
+
+    def add(self, state):
+        self.count += 1
+
+    def clear(self):
+        self.count = 0
+
+    def copy(self):
+        return ExploredCounter(self.count)
+
+    def __len__(self):
+        return self.count
+
+class BoundedExploredSet(set):
+    """
+    An explored-state sink for GameState.trackExplored that keeps at most
+    maxSize distinct states; other states added once it is full are only
+    counted, with repetitions, in dropped.
+    """
+    def __init__(self, maxSize, states=()):
+        set.__init__(self, states)
+        self.maxSize = maxSize
+        self.dropped = 0
+
+    def add(self, state):
+        if len(self) < self.maxSize: set.add(self, state)
+        elif state not in self: self.dropped += 1
+
+    def clear(self):
+        set.clear(self)
+        self.dropped = 0
+
+    def copy(self):
+        copy = BoundedExploredSet(self.maxSize, self)
+        copy.dropped = self.dropped
+        return copy
+
 class GameState:
     """
     A GameState specifies the full game state, including the food, capsules,
@@ -71,11 +120,22 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
-    explored = set()
+    # static variable keeps track of the states generateSuccessor has been
+    # called on and has returned; None (the default) turns tracking off
+    explored = None
+    def trackExplored(sink=None):
+        """
+        Starts recording explored states in sink: a set (every state, as the
+        autograder needs), a BoundedExploredSet or an ExploredCounter.  With
+        no sink, stops recording.
+        """
+        GameState.explored = sink
+    trackExplored = staticmethod(trackExplored)
+
     def getAndResetExplored():
+        if GameState.explored is None: return set()
         tmp = GameState.explored.copy()
-        GameState.explored = set()
+        GameState.explored.clear()
         return tmp
     getAndResetExplored = staticmethod(getAndResetExplored)
 
@@ -91,38 +151,75 @@ class GameState:
         else:
             return GhostRules.getLegalActions( self, agentIndex )
 
-    def generateSuccessor( self, agentIndex, action):
+    def generateSuccessor( self, agentIndex, action, validate=True ):
         """
         Returns the successor state after the specified agent takes the action.
+        Without validate, the action is not checked against the legal actions
+        (for replaying moves already known to be legal).
         """
         # Check that successors exist
         if self.isWin() or self.isLose(): raise Exception('Can\'t generate a successor of a terminal state.')
 
         # Copy current state
         state = GameState(self)
+        state._move( agentIndex, action, validate )
+        if GameState.explored is not None:
+            GameState.explored.add(self)
+            GameState.explored.add(state)
+        return state
 
+    def applyMove( self, agentIndex, action ):
+        """
+        Makes the move in this state, as generateSuccessor would in a new one,
+        and returns an undo record for undoMove.  Moves must be undone in the
+        reverse order they were made.  This lets game-tree agents walk the
+        tree in one state, changed in place, instead of building a GameState
+        per node:
+
+            undo = state.applyMove( agentIndex, action )
+            value = self.search( state, depth + 1 )
+            state.undoMove( undo )
+
+        The state's food grid and agent states change with it, so copy those
+        you keep.  Building a successor of the state in the middle of a walk
+        is fine, but costs the next applyMove a copy of the food grid.
+        States applied this way are not recorded in GameState.explored.
+        """
+        if self.isWin() or self.isLose(): raise Exception('Can\'t apply a move to a terminal state.')
+        undo = self.data.saveMove( agentIndex )
+        try:
+            self._move( agentIndex, action )
+        except:
+            self.data.restoreMove( undo )
+            raise
+        return undo
+
+    def undoMove( self, undo ):
+        """
+        Puts the state back as it was before the applyMove that returned undo.
+        """
+        self.data.restoreMove( undo )
+
+    def _move( self, agentIndex, action, validate=True ):
         # Let agent's logic deal with its action's effects on the board
         if agentIndex == 0:  # Pacman is moving
-            state.data._eaten = [False for i in range(state.getNumAgents())]
-            PacmanRules.applyAction( state, action )
+            if True in self.data._eaten: self.data._eaten = [False] * self.getNumAgents()
+            PacmanRules.applyAction( self, action, validate )
         else:                # A ghost is moving
-            GhostRules.applyAction( state, action, agentIndex )
+            GhostRules.applyAction( self, action, agentIndex, validate )
 
         # Time passes
         if agentIndex == 0:
-            state.data.scoreChange += -TIME_PENALTY # Penalty for waiting around
+            self.data.scoreChange += -TIME_PENALTY # Penalty for waiting around
         else:
-            GhostRules.decrementTimer( state.data.agentStates[agentIndex] )
+            GhostRules.decrementTimer( self.data.mutableAgentState(agentIndex) )
 
         # Resolve multi-agent effects
-        GhostRules.checkDeath( state, agentIndex )
+        GhostRules.checkDeath( self, agentIndex )
 
         # Book keeping
-        state.data._agentMoved = agentIndex
-        state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
-        return state
+        self.data._agentMoved = agentIndex
+        self.data.score += self.data.scoreChange
 
     def getLegalPacmanActions( self ):
         return self.getLegalActions( 0 )
@@ -174,7 +271,7 @@ class GameState:
         return self.data.capsules
 
     def getNumFood( self ):
-        return self.data.food.count()
+        return self.data.getNumFood()
 
     def getFood(self):
         """
@@ -231,6 +328,21 @@ class GameState:
         state.data = self.data.deepCopy()
         return state
 
+    def snapshot( self ):
+        """
+        Returns a cheap copy of the state for code that only reads it, such
+        as agents in Game.runFast.  Unlike deepCopy, it shares its food,
+        capsules, agent states and layout with this state, so these must not
+        be changed in place (generateSuccessor and applyMove on the snapshot
+        are fine: they copy what they change).
+        """
+        state = GameState( self )
+        data, old = state.data, self.data
+        data._agentMoved, data._foodEaten, data._foodAdded, data._capsuleEaten = \
+            old._agentMoved, old._foodEaten, old._foodAdded, old._capsuleEaten
+        data._win, data._lose, data.scoreChange = old._win, old._lose, old.scoreChange
+        return state
+
     def __eq__( self, other ):
         """
         Allows two states to be compared.
@@ -253,6 +365,114 @@ class GameState:
         """
         self.data.initialize(layout, numGhostAgents)
 
+    def toBytes( self ):
+        """
+        Returns a compact binary form of the state, for fromBytes.  The layout
+        is left out (fromBytes is given a reference to it): varints for the
+        number of agents, the win and lose flags and the score; one bit for
+        each of the layout's food dots and capsules, set if it is still
+        there; then for each agent, varints for its coordinates, its
+        direction (its game.DIRECTIONS number), whether it was eaten this
+        turn, and its scared timer.
+        """
+        data = self.data
+        foodCells, foodIndices = _layoutFood(data.layout)
+        out = bytearray()
+        writeVarint(out, len(data.agentStates))
+        writeVarint(out, data._win | data._lose << 1)
+        score = int(data.score)
+        writeVarint(out, score << 1 if score >= 0 else (-score << 1) - 1)
+        capsules = bytes([position in data.capsules for position in data.layout.capsules])
+        out += bitsToBytes(bytes(compress(data.food._cellBytes(), foodCells)) + capsules)
+        eaten = data._eaten
+        for agentIndex, agentState in enumerate(data.agentStates):
+            configuration = agentState.configuration
+            x, y = configuration.pos
+            writeVarint(out, _packCoordinate(x))
+            writeVarint(out, _packCoordinate(y))
+            writeVarint(out, DIRECTION_NUMBERS[configuration.direction] << 1 | bool(eaten[agentIndex]))
+            writeVarint(out, agentState.scaredTimer)
+        return bytes(out)
+
+    def fromBytes( layoutRef, data ):
+        """
+        Returns the state toBytes turned into data.  layoutRef is the state's
+        layout, or its reference in the layout registry (see
+        layout.registerLayout), so that states can be shipped between
+        processes without their layout.
+        """
+        theLayout = layoutRef
+        if isinstance(layoutRef, str):
+            theLayout = layout.getLayoutByRef(layoutRef)
+            if theLayout is None: raise Exception('Unknown layout ' + layoutRef)
+        numAgents, offset = readVarint(data, 0)
+        # A successor of the start state, sharing what it does not change
+        state = GameState(_startState(theLayout, numAgents))
+        stateData = state.data
+        flags, offset = readVarint(data, offset)
+        stateData._win, stateData._lose = bool(flags & 1), bool(flags & 2)
+        score, offset = readVarint(data, offset)
+        stateData.score = score >> 1 if not score & 1 else -((score + 1) >> 1)
+
+        foodIndices = _layoutFood(theLayout)[1]
+        numFood = len(foodIndices)
+        numBits = numFood + len(theLayout.capsules)
+        numBytes = (numBits + 7) // 8
+        bits = bytesToBits(data[offset:offset + numBytes], numBits)
+        offset += numBytes
+        if bits.count(0, 0, numFood):
+            food = stateData.mutableFood()
+            height = theLayout.height
+            # Columns of either Grid class, written in place
+            for index in compress(foodIndices, bits[:numFood].translate(_BIT_INVERT)):
+                food[index // height][index % height] = False
+            food._hash = None
+        stateData.capsules = list(compress(theLayout.capsules, bits[numFood:]))
+        stateData._ownsCapsules = True
+
+        eaten = []
+        for agentIndex in range(numAgents):
+            agentState = stateData.mutableAgentState(agentIndex)
+            x, offset = readVarint(data, offset)
+            y, offset = readVarint(data, offset)
+            flags, offset = readVarint(data, offset)
+            agentState.configuration = Configuration((_unpackCoordinate(x), _unpackCoordinate(y)), DIRECTIONS[flags >> 1])
+            agentState.scaredTimer, offset = readVarint(data, offset)
+            eaten.append(bool(flags & 1))
+        stateData._eaten = eaten
+        return state
+    fromBytes = staticmethod(fromBytes)
+
+# (layout reference, grid class) -> (food cells as bytes of 0 and 1, cell
+# indices of the food)
+_LAYOUT_FOOD = {}
+# (layout reference, grid class, number of agents) -> start state, see
+# GameState.fromBytes; layouts of the same text may use either grid class
+_START_STATES = {}
+
+def _startState(theLayout, numAgents):
+    key = (layout.layoutRef(theLayout), theLayout.gridClass, numAgents)
+    if key not in _START_STATES:
+        state = GameState()
+        state.initialize(theLayout, numAgents - 1)
+        _START_STATES[key] = state
+    return _START_STATES[key]
+
+def _layoutFood(theLayout):
+    key = (layout.layoutRef(theLayout), theLayout.gridClass)
+    if key not in _LAYOUT_FOOD:
+        cells = theLayout.food._cellBytes()
+        _LAYOUT_FOOD[key] = (cells, [index for index, cell in enumerate(cells) if cell])
+    return _LAYOUT_FOOD[key]
+
+def _packCoordinate(value):
+    "A whole or half coordinate, doubled, and whether it is an int."
+    return int(value * 2) << 1 | isinstance(value, int)
+
+def _unpackCoordinate(n):
+    if n & 1: return n >> 2
+    return (n >> 1) / 2.0
+
 ############################################################################
 #                     THE HIDDEN SECRETS OF PACMAN                         #
 #                                                                          #
@@ -271,13 +491,14 @@ class ClassicGameRules:
     def __init__(self, timeout=30):
         self.timeout = timeout
 
-    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False):
+    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False, fast=False):
         agents = [pacmanAgent] + ghostAgents[:layout.getNumGhosts()]
         initState = GameState()
         initState.initialize( layout, len(ghostAgents) )
-        game = Game(agents, display, self, catchExceptions=catchExceptions)
+        game = Game(agents, display, self, catchExceptions=catchExceptions, fast=fast)
         game.state = initState
-        self.initialState = initState.deepCopy()
+        if fast: self.initialState = initState.snapshot()
+        else: self.initialState = initState.deepCopy()
         self.quiet = quiet
         return game
 
@@ -331,18 +552,24 @@ class PacmanRules:
         """
         Returns a list of possible actions.
         """
-        return Actions.getPossibleActions( state.getPacmanState().configuration, state.data.layout.walls )
+        conf = state.data.agentStates[0].configuration
+        layout = state.data.layout
+        x, y = conf.pos
+        if x == int(x) and y == int(y):
+            # On a grid point: look the actions up
+            actions = layout.legalActions[int(x) * layout.height + int(y)]
+            if actions is not None: return list(actions)
+        return Actions.getPossibleActions( conf, layout.walls )
     getLegalActions = staticmethod( getLegalActions )
 
-    def applyAction( state, action ):
+    def applyAction( state, action, validate=True ):
         """
         Edits the state to reflect the results of the action.
         """
-        legal = PacmanRules.getLegalActions( state )
-        if action not in legal:
+        if validate and action not in PacmanRules.getLegalActions( state ):
             raise Exception("Illegal action " + str(action))
 
-        pacmanState = state.data.agentStates[0]
+        pacmanState = state.data.mutableAgentState(0)
 
         # Update Configuration
         vector = Actions.directionToVector( action, PacmanRules.PACMAN_SPEED )
@@ -361,21 +588,18 @@ class PacmanRules:
         # Eat food
         if state.data.food[x][y]:
             state.data.scoreChange += 10
-            state.data.food = state.data.food.copy()
-            state.data.food[x][y] = False
+            numFood = state.data.eatFood(x, y)
             state.data._foodEaten = position
-            # TODO: cache numFood?
-            numFood = state.getNumFood()
             if numFood == 0 and not state.data._lose:
                 state.data.scoreChange += 500
                 state.data._win = True
         # Eat capsule
-        if( position in state.getCapsules() ):
-            state.data.capsules.remove( position )
+        if state.data.hasCapsule( position ):
+            state.data.eatCapsule( position )
             state.data._capsuleEaten = position
             # Reset all ghosts' scared timers
             for index in range( 1, len( state.data.agentStates ) ):
-                state.data.agentStates[index].scaredTimer = SCARED_TIME
+                state.data.mutableAgentState(index).scaredTimer = SCARED_TIME
     consume = staticmethod( consume )
 
 class GhostRules:
@@ -389,7 +613,13 @@ class GhostRules:
         reach a dead end, but can turn 90 degrees at intersections.
         """
         conf = state.getGhostState( ghostIndex ).configuration
-        possibleActions = Actions.getPossibleActions( conf, state.data.layout.walls )
+        layout = state.data.layout
+        x, y = conf.pos
+        if x == int(x) and y == int(y):
+            # On a grid point: look the actions up
+            actions = layout.ghostActions[conf.direction][int(x) * layout.height + int(y)]
+            if actions is not None: return list(actions)
+        possibleActions = Actions.getPossibleActions( conf, layout.walls )
         reverse = Actions.reverseDirection( conf.direction )
         if Directions.STOP in possibleActions:
             possibleActions.remove( Directions.STOP )
@@ -398,13 +628,12 @@ class GhostRules:
         return possibleActions
     getLegalActions = staticmethod( getLegalActions )
 
-    def applyAction( state, action, ghostIndex):
+    def applyAction( state, action, ghostIndex, validate=True ):
 
-        legal = GhostRules.getLegalActions( state, ghostIndex )
-        if action not in legal:
+        if validate and action not in GhostRules.getLegalActions( state, ghostIndex ):
             raise Exception("Illegal ghost action " + str(action))
 
-        ghostState = state.data.agentStates[ghostIndex]
+        ghostState = state.data.mutableAgentState(ghostIndex)
         speed = GhostRules.GHOST_SPEED
         if ghostState.scaredTimer > 0: speed /= 2.0
         vector = Actions.directionToVector( action, speed )
@@ -414,7 +643,9 @@ class GhostRules:
     def decrementTimer( ghostState):
         timer = ghostState.scaredTimer
         if timer == 1:
-            ghostState.configuration.pos = nearestPoint( ghostState.configuration.pos )
+            # A new Configuration: the old one may be shared with other states
+            configuration = ghostState.configuration
+            ghostState.configuration = Configuration( nearestPoint( configuration.pos ), configuration.direction )
         ghostState.scaredTimer = max( 0, timer - 1 )
     decrementTimer = staticmethod( decrementTimer )
 
@@ -435,10 +666,12 @@ class GhostRules:
 
     def collide( state, ghostState, agentIndex):
         if ghostState.scaredTimer > 0:
+            ghostState = state.data.mutableAgentState(agentIndex)
             state.data.scoreChange += 200
             GhostRules.placeGhost(state, ghostState)
             ghostState.scaredTimer = 0
-            # Added for first-person
+            # Added for first-person; _eaten may be shared with the predecessor
+            state.data._eaten = state.data._eaten[:]
             state.data._eaten[agentIndex] = True
         else:
             if not state.data._win:
@@ -511,8 +744,14 @@ def readCommand( argv ):
                       help='Fixes the random seed to always play the same game', default=False)
     parser.add_option('-r', '--recordActions', action='store_true', dest='record',
                       help='Writes game histories to a file (named by the time they were played)', default=False)
+    parser.add_option('--recordFormat', dest='recordFormat', type='choice', choices=['pickle', 'compact'],
+                      help=default('The format of recorded games: pickle, or compact (see gameRecords.py)'), default='pickle')
     parser.add_option('--replay', dest='gameToReplay',
-                      help='A recorded game file (pickle) to replay', default=None)
+                      help='A recorded game file (pickle or compact) to replay', default=None)
+    parser.add_option('--fastReplay', action='store_true', dest='fastReplay',
+                      help='Replays headless and reports scores and divergences (see fastReplay); --replay may then be a directory of recordings, replayed over --workers processes', default=False)
+    parser.add_option('--noValidation', action='store_true', dest='noValidation',
+                      help='With --fastReplay, applies the recorded moves without checking them against the rules', default=False)
     parser.add_option('-a','--agentArgs',dest='agentArgs',
                       help='Comma separated values sent to agent. e.g. "opt1=val1,opt2,opt3=val3"')
     parser.add_option('-x', '--numTraining', dest='numTraining', type='int',
@@ -523,6 +762,10 @@ def readCommand( argv ):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--fast', action='store_true', dest='fast',
+                      help='Runs games in the lean headless loop (see Game.runFast)', default=False)
+    parser.add_option('--workers', dest='workers', type='int',
+                      help='Plays the games headless over this many processes, with one random seed per game', default=0)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -532,6 +775,11 @@ def readCommand( argv ):
     # Fix the random seed
     if options.fixRandomSeed: random.seed('cs188')
 
+    # Headless replays need no agents or display
+    if options.gameToReplay != None and options.fastReplay:
+        runFastReplays(options.gameToReplay, options.workers, not options.noValidation)
+        sys.exit(0)
+
     # Choose a layout
     args['layout'] = layout.getLayout( options.layout )
     if args['layout'] == None: raise Exception("The layout " + options.layout + " cannot be found")
@@ -568,16 +816,16 @@ def readCommand( argv ):
         args['display'] = graphicsDisplay.PacmanGraphics(options.zoom, frameTime = options.frameTime)
     args['numGames'] = options.numGames
     args['record'] = options.record
+    args['recordFormat'] = options.recordFormat
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    args['fast'] = options.fast
+    args['workers'] = options.workers
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
         print('Replaying recorded game %s.' % options.gameToReplay)
-        import pickle
-        f = open(options.gameToReplay, 'rb')
-        try: recorded = pickle.load(f)
-        finally: f.close()
+        recorded = loadRecordedGame(options.gameToReplay)
         recorded['display'] = args['display']
         replayGame(**recorded)
         sys.exit(0)
@@ -607,10 +855,25 @@ def loadAgent(pacman, nographics):
                 return getattr(module, pacman)
     raise Exception('The agent ' + pacman + ' is not specified in any *Agents.py.')
 
-def replayGame( layout, actions, display ):
+def loadRecordedGame( fileName ):
+    """
+    Returns the layout and actions of a recorded game, pickled or compact,
+    as replayGame's arguments.
+    """
+    import gameRecords
+    if gameRecords.isRecord(fileName):
+        reader = gameRecords.RecordReader(fileName)
+        return {'layout': reader.layout, 'actions': reader.getMoves(), 'numGhosts': reader.numAgents - 1}
+    import pickle
+    f = open(fileName, 'rb')
+    try: return pickle.load(f)
+    finally: f.close()
+
+def replayGame( layout, actions, display, numGhosts=None ):
     import pacmanAgents, ghostAgents
     rules = ClassicGameRules()
-    agents = [pacmanAgents.GreedyAgent()] + [ghostAgents.RandomGhost(i+1) for i in range(layout.getNumGhosts())]
+    if numGhosts is None: numGhosts = layout.getNumGhosts()
+    agents = [pacmanAgents.GreedyAgent()] + [ghostAgents.RandomGhost(i+1) for i in range(numGhosts)]
     game = rules.newGame( layout, agents[0], agents[1:], display )
     state = game.state
     display.initialize(state.data)
@@ -625,7 +888,127 @@ def replayGame( layout, actions, display ):
 
     display.finish()
 
-def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30 ):
+class ReplayResult:
+    """
+    The outcome of replaying a recorded game headless (see fastReplay): the
+    final score, whether Pacman won or lost, the number of moves replayed,
+    and the divergences found, as (move number, reason) pairs.  Move n is the
+    nth move of the record, counting from 1.
+    """
+    def __init__( self, fileName, score, win, lose, numMoves, divergences ):
+        self.fileName = fileName
+        self.score = score
+        self.win = win
+        self.lose = lose
+        self.numMoves = numMoves
+        self.divergences = divergences
+
+def fastReplay( fileName, validate=True ):
+    """
+    Replays a recorded game (pickled or compact) without a display, and
+    returns a ReplayResult.  Divergences are:
+
+      - a move out of turn (agents move in turn from Pacman on);
+      - with validate, an illegal move, which ends the replay;
+      - moves left over after the game is over;
+      - in compact records, a keyframe that differs from the replayed state
+        (the replay then carries on from the keyframe).
+
+    Without validate, moves are applied without checking them against the
+    rules: a record that is known to be good replays faster.
+    """
+    import gameRecords
+    if gameRecords.isRecord(fileName):
+        reader = gameRecords.RecordReader(fileName)
+        state = reader.startState()
+        moves, keyframes = reader.moves(), reader.keyframes
+    else:
+        recorded = loadRecordedGame(fileName)
+        state = GameState()
+        state.initialize( recorded['layout'], recorded['layout'].getNumGhosts() )
+        moves, keyframes = recorded['actions'], {}
+    numAgents = state.getNumAgents()
+    divergences = []
+    numMoves = 0
+    for agentIndex, action in moves:
+        if state.isWin() or state.isLose():
+            divergences.append( (numMoves + 1, 'moves after the end of the game') )
+            break
+        if agentIndex != numMoves % numAgents:
+            divergences.append( (numMoves + 1, 'agent %d moved out of turn' % agentIndex) )
+        try:
+            state = state.generateSuccessor( agentIndex, action, validate )
+        except Exception as error:
+            divergences.append( (numMoves + 1, str(error)) )
+            break
+        numMoves += 1
+        if numMoves in keyframes:
+            keyframe = reader.keyframe(numMoves)
+            if keyframe != state or keyframe.isWin() != state.isWin() or keyframe.isLose() != state.isLose():
+                divergences.append( (numMoves, 'the state differs from the recorded keyframe') )
+                state = keyframe
+    return ReplayResult( fileName, state.getScore(), state.isWin(), state.isLose(), numMoves, divergences )
+
+def _fastReplay( task ):
+    return fastReplay( *task )
+
+def fastReplays( fileNames, workers=1, validate=True ):
+    """
+    Yields the ReplayResults of fastReplay for each file, in order, replaying
+    them over a pool of workers processes (with workers=1, in this process).
+    """
+    tasks = [(fileName, validate) for fileName in fileNames]
+    if workers == 1:
+        for task in tasks:
+            yield _fastReplay(task)
+        return
+    import multiprocessing
+    pool = multiprocessing.Pool(workers)
+    try:
+        for result in pool.imap(_fastReplay, tasks, chunksize=16):
+            yield result
+    finally:
+        pool.terminate()
+
+def runFastReplays( path, workers=1, validate=True ):
+    """
+    Replays the recorded game in path, or every recorded-game-* file in the
+    directory path, headless, and prints their results and divergences.
+    Returns the ReplayResults.
+    """
+    if os.path.isdir(path):
+        fileNames = [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.startswith('recorded-game-')]
+    else:
+        fileNames = [path]
+    start = time.perf_counter()
+    results = []
+    for result in fastReplays( fileNames, max(workers, 1), validate ):
+        outcome = 'Win' if result.win else 'Loss' if result.lose else 'Unfinished'
+        print('%s: %s, score %d after %d moves' % (result.fileName, outcome, result.score, result.numMoves))
+        for numMove, reason in result.divergences:
+            print('  diverges at move %d: %s' % (numMove, reason))
+        results.append(result)
+    numDiverging = len([result for result in results if result.divergences])
+    print('Replayed %d games in %.2f seconds, %d with divergences' % (len(results), time.perf_counter() - start, numDiverging))
+    return results
+
+def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30, fast=False, workers=0, recordFormat='pickle' ):
+    """
+    Plays numGames games and prints a summary of them.  With workers, see
+    runGamesInWorkers.  With record, each game is written to a file, pickled
+    once it is over or, with recordFormat='compact', move by move.
+    """
+    # Search problems draw their expanded cells on the display, if it can;
+    # games of an earlier display must not keep drawing on it
+    import search
+    if hasattr(display, 'expandedCellsObserver') and not workers:
+        search.visualObserverFactories[:] = [display.expandedCellsObserver]
+    else:
+        del search.visualObserverFactories[:]
+
+    if workers:
+        return runGamesInWorkers( layout, pacman, ghosts, numGames, record, numTraining, catchExceptions, timeout, fast, workers, recordFormat )
+
     import __main__
     __main__.__dict__['_display'] = display
 
@@ -642,28 +1025,146 @@ def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0
         else:
             gameDisplay = display
             rules.quiet = False
-        game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions)
-        game.run()
+        game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions, fast)
+        if record and recordFormat == 'compact':
+            import gameRecords
+            game.recorder = gameRecords.RecordWriter( recordFileName(i) + '.rec', layout, game.state.getNumAgents() )
+            try: game.run()
+            finally: game.recorder.close()
+        else:
+            game.run()
         if not beQuiet: games.append(game)
 
-        if record:
-            import time, pickle
-            fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
-            f = open(fname, 'wb')
-            components = {'layout': layout, 'actions': game.moveHistory}
-            pickle.dump(components, f)
-            f.close()
-
-    if (numGames-numTraining) > 0:
-        scores = [game.state.getScore() for game in games]
-        wins = [game.state.isWin() for game in games]
+        if record and recordFormat == 'pickle': recordGame( i, layout, game.moveHistory )
+
+    printSummary( [game.state.getScore() for game in games], [game.state.isWin() for game in games] )
+    return games
+
+def recordFileName( i ):
+    "The name of the file game i is recorded in, after the time it was played."
+    return ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
+
+def recordGame( i, layout, moveHistory, recordFormat='pickle', numAgents=None ):
+    if recordFormat == 'compact':
+        import gameRecords
+        if numAgents is None: numAgents = layout.getNumGhosts() + 1
+        gameRecords.writeRecord( recordFileName(i) + '.rec', layout, numAgents, moveHistory )
+        return
+    import pickle
+    fname = recordFileName(i)
+    f = open(fname, 'wb')
+    components = {'layout': layout, 'actions': moveHistory}
+    pickle.dump(components, f)
+    f.close()
+
+def printSummary( scores, wins ):
+    if len(scores) > 0:
         winRate = wins.count(True)/ float(len(wins))
         print('Average Score:', sum(scores) / float(len(scores)))
         print('Scores:       ', ', '.join([str(score) for score in scores]))
         print('Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate))
         print('Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins]))
 
-    return games
+class GameResult:
+    """
+    The outcome of a game played by playGames: its index and random seed,
+    final score, whether Pacman won or lost (neither, if an agent crashed),
+    the number of moves, the wall-clock seconds it took, and its moves if
+    they were asked for.
+    """
+    def __init__( self, index, seed, score, win, lose, numMoves, seconds, moveHistory=None ):
+        self.index = index
+        self.seed = seed
+        self.score = score
+        self.win = win
+        self.lose = lose
+        self.numMoves = numMoves
+        self.seconds = seconds
+        self.moveHistory = moveHistory
+
+# The game components of a playGames worker, see _initWorker
+_workerGame = None
+
+def _initWorker( layout, *components ):
+    """
+    Sets up a playGames worker.  layout may be the name of a layout
+    published in shared memory (see sharedLayouts.py), to attach to.
+    """
+    global _workerGame
+    if isinstance(layout, str):
+        import sharedLayouts
+        layout = sharedLayouts.attach(layout).getLayout()
+    _workerGame = (layout,) + components
+
+def _playSeededGame( task ):
+    index, seed = task
+    layout, pacman, ghosts, catchExceptions, timeout, fast, keepMoves = _workerGame
+    import textDisplay
+    random.seed(seed)
+    start = time.perf_counter()
+    rules = ClassicGameRules(timeout)
+    game = rules.newGame( layout, pacman, ghosts, textDisplay.NullGraphics(), True, catchExceptions, fast )
+    game.run()
+    return GameResult( index, seed, game.state.getScore(), game.state.isWin(), game.state.isLose(), len(game.moveHistory),
+                       time.perf_counter() - start, game.moveHistory if keepMoves else None )
+
+def playGames( layout, pacman, ghosts, numGames, workers=1, catchExceptions=False, timeout=30, fast=True, keepMoves=False, seeds=None ):
+    """
+    Plays numGames headless games over a pool of workers processes (with
+    workers=1, in this process), and yields a GameResult for each game, in
+    order, as soon as it is known.
+
+    Game i starts from random.seed(seeds[i]).  The seeds default to numbers
+    drawn from the random module, so with a fixed random seed (pacman.py -f)
+    the games are the same whatever the number of workers.  Each worker plays
+    its games with its own copy of the agents, so agents that learn across
+    games only see the games of their worker.  The layout is published once
+    in shared memory for the workers, with its maze distances if they have
+    been computed (see sharedLayouts.publish).
+    """
+    if seeds is None: seeds = [random.randrange(1 << 32) for i in range(numGames)]
+    tasks = list(enumerate(seeds[:numGames]))
+    components = (layout, pacman, ghosts, catchExceptions, timeout, fast, keepMoves)
+    if workers == 1:
+        _initWorker(*components)
+        for task in tasks:
+            yield _playSeededGame(task)
+        return
+    import multiprocessing
+    try:
+        import sharedLayouts
+        shared = sharedLayouts.publish(layout)
+        components = (shared.name,) + components[1:]
+    except ImportError:
+        shared = None
+    try:
+        pool = multiprocessing.Pool(workers, _initWorker, components)
+        try:
+            for result in pool.imap(_playSeededGame, tasks):
+                yield result
+        finally:
+            pool.terminate()
+    finally:
+        if shared is not None: shared.unlink()
+
+def runGamesInWorkers( layout, pacman, ghosts, numGames, record, numTraining = 0, catchExceptions=False, timeout=30, fast=False, workers=1, recordFormat='pickle' ):
+    """
+    runGames over a pool of processes (see playGames): the games are headless
+    and seeded one by one, so the summary matches that of a run with
+    workers=1, which plays the same games in this process.  Games are recorded
+    here, from their moves, as they come in.  Returns the GameResults of the
+    games that are not training games.
+    """
+    results = []
+    games = playGames( layout, pacman, ghosts, numGames, workers, catchExceptions, timeout, fast, record )
+    for result in games:
+        if record: recordGame( result.index, layout, result.moveHistory, recordFormat, min(len(ghosts), layout.getNumGhosts()) + 1 )
+        if result.index < numTraining: continue
+        if result.win: print("Pacman emerges victorious! Score: %d" % result.score)
+        if result.lose: print("Pacman died! Score: %d" % result.score)
+        results.append(result)
+    printSummary( [result.score for result in results], [result.win for result in results] )
+    return results
 
 if __name__ == '__main__':
     """
@@ -0,0 +1,225 @@
+# pacmanEnv.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+reset()/step(action) environments for driving Pacman from training code,
+instead of letting runGames own the loop:
+
+> env = PacmanEnv(layout.getLayout('smallClassic'), [RandomGhost(1), RandomGhost(2)])
+> observation = env.reset(seed=0)
+> legalActions = env.legalActions()
+> while True:
+>     observation, reward, done, info = env.step(random.choice(legalActions))
+>     if done: break
+>     legalActions = info['legalActions']
+
+VectorEnv steps several PacmanEnvs at once, possibly in subprocesses, and
+starts a new game in an environment as soon as its game is over.
+"""
+
+import random
+
+from game import DIRECTIONS
+import pacman
+
+# Action numbers, for step: those of game.DIRECTIONS
+ACTIONS = DIRECTIONS
+
+def stateVector(state):
+    """
+    The default observation: Pacman's position, then each ghost's position
+    and scared timer, the number of food dots and capsules left, and the
+    score, as a list of numbers.
+    """
+    vector = list(state.getPacmanPosition())
+    for ghostState in state.data.agentStates[1:]:
+        vector.extend(ghostState.configuration.pos)
+        vector.append(ghostState.scaredTimer)
+    vector.extend([state.getNumFood(), len(state.data.capsules), state.data.score])
+    return vector
+
+class PacmanEnv:
+    """
+    A classic Pacman game against ghost agents, played one Pacman action at
+    a time: step plays Pacman's action and then the ghosts' replies.
+
+    observe turns the GameState into the observation reset and step return
+    (stateVector by default; the identity gives the GameState itself).  Each
+    game starts from a fresh state of its own, so changing the states of a
+    game does not change the next ones.
+
+    The ghost agents draw from the random module.  Each game has a random
+    stream of its own, seeded by reset(seed), which is swapped into the
+    random module for the ghosts' moves: games are the same whatever else
+    uses the random module meanwhile, such as other environments.
+    """
+    def __init__(self, layout, ghosts, observe=stateVector, timeout=30):
+        self.layout = layout
+        self.rules = pacman.ClassicGameRules(timeout)
+        self.rules.quiet = True
+        self.numGhosts = min(len(ghosts), layout.getNumGhosts())
+        self.ghosts = ghosts[:self.numGhosts]
+        self.observe = observe
+        self.state = None
+        self.randomState = None
+        self.gameOver = True
+
+    def reset(self, seed=None):
+        """
+        Starts a new game, whose ghosts' random stream is seeded with seed
+        (by default, a seed drawn from the random module), and returns its
+        first observation.
+        """
+        if seed is None: seed = random.getrandbits(32)
+        self.randomState = random.Random(seed).getstate()
+        self.state = pacman.GameState()
+        self.state.initialize(self.layout, self.numGhosts)
+        self.gameOver = False
+        self.numMoves = 0
+        return self.observe(self.state)
+
+    def legalActions(self):
+        return self.state.getLegalPacmanActions()
+
+    def step(self, action):
+        """
+        Plays Pacman's action (a Directions string or a number, see ACTIONS),
+        then each ghost's, and returns (observation, reward, done, info).  The
+        reward is the change of score; info holds the score, win and lose
+        flags, and Pacman's legal actions in the new state.
+        """
+        if self.gameOver: raise Exception('The game is over: call reset first')
+        if not isinstance(action, str): action = ACTIONS[action]
+        scoreBefore = self.state.data.score
+        self._move(0, action)
+        outerState = random.getstate()
+        random.setstate(self.randomState)
+        try:
+            for ghost in self.ghosts:
+                if self.gameOver: break
+                self._move(ghost.index, ghost.getAction(self.state))
+        finally:
+            self.randomState = random.getstate()
+            random.setstate(outerState)
+        state = self.state
+        info = {'score': state.data.score, 'win': state.isWin(), 'lose': state.isLose(),
+                'legalActions': state.getLegalPacmanActions()}
+        return self.observe(state), state.data.score - scoreBefore, self.gameOver, info
+
+    def _move(self, agentIndex, action):
+        self.state = self.state.generateSuccessor(agentIndex, action)
+        self.numMoves += 1
+        # Sets gameOver on a win or a loss
+        self.rules.process(self.state, self)
+
+def _envWorker(connection, envs):
+    """
+    The loop of a VectorEnv subprocess: runs the commands of its connection
+    on its envs, until it is sent None.
+    """
+    while True:
+        command = connection.recv()
+        if command is None: break
+        name, arguments = command
+        connection.send([getattr(env, name)(*args) for env, args in zip(envs, arguments)])
+    connection.close()
+
+class AutoResetEnv:
+    """
+    A PacmanEnv that starts a new game when its game is over: the step that
+    ends a game returns the first observation of the next one, and puts the
+    last observation of the game in info['finalObservation'].  The seeds of
+    the next games are drawn from a random stream seeded by reset(seed), so
+    all the games after a reset are reproducible.
+    """
+    def __init__(self, env):
+        self.env = env
+        self.seeds = None
+
+    def reset(self, seed=None):
+        if seed is None: seed = random.getrandbits(32)
+        self.seeds = random.Random(seed)
+        return self.env.reset(seed)
+
+    def step(self, action):
+        observation, reward, done, info = self.env.step(action)
+        if done:
+            info['finalObservation'] = observation
+            observation = self.env.reset(self.seeds.getrandbits(32))
+            info['legalActions'] = self.env.legalActions()
+        return observation, reward, done, info
+
+class VectorEnv:
+    """
+    Several auto-resetting PacmanEnvs (see AutoResetEnv), stepped together.
+    makeEnv() builds each environment.  With workers, the environments are
+    spread over that many subprocesses, each stepping its own share.
+    """
+    def __init__(self, makeEnv, numEnvs, workers=0):
+        self.numEnvs = numEnvs
+        self.workers = workers
+        envs = [AutoResetEnv(makeEnv()) for i in range(numEnvs)]
+        if not workers:
+            self.envs = envs
+            return
+        import multiprocessing
+        self.shares = [list(range(i, numEnvs, workers)) for i in range(workers)]
+        self.connections = []
+        self.processes = []
+        for share in self.shares:
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_envWorker, args=(child, [envs[i] for i in share]))
+            process.daemon = True
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def _call(self, name, arguments):
+        if not self.workers:
+            return [getattr(env, name)(*args) for env, args in zip(self.envs, arguments)]
+        for connection, share in zip(self.connections, self.shares):
+            connection.send((name, [arguments[i] for i in share]))
+        results = [None] * self.numEnvs
+        for connection, share in zip(self.connections, self.shares):
+            for i, result in zip(share, connection.recv()):
+                results[i] = result
+        return results
+
+    def reset(self, seeds=None):
+        """
+        Starts a game in every environment, game i with random seed seeds[i]
+        (by default, seeds drawn from the random module), whatever the
+        number of workers.
+        """
+        if seeds is None: seeds = [random.getrandbits(32) for i in range(self.numEnvs)]
+        return self._call('reset', [(seed,) for seed in seeds])
+
+    def step(self, actions):
+        """
+        Steps environment i with actions[i]; returns the lists of
+        observations, rewards, done flags and infos.
+        """
+        results = self._call('step', [(action,) for action in actions])
+        return tuple(map(list, zip(*results)))
+
+    def close(self):
+        if not self.workers: return
+        for connection in self.connections:
+            connection.send(None)
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.workers = 0
+        self.envs = []
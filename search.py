@@ -17,8 +17,19 @@ In search.py, you will implement generic search algorithms which are called by
 Pacman agents (in searchAgents.py).
 """
 
+import json
+import time
 import util
 
+# How many expansions the *Stream search functions run between two progress
+# events.
+REPORT_EVERY = 1000
+
+# Factories for the observers that every visualised search problem subscribes
+# (see PositionSearchProblem).  pacman.runGames registers the display's here
+# when it can draw expanded cells; headless runs leave it empty.
+visualObserverFactories = []
+
 
 class SearchProblem:
     """
@@ -28,6 +39,19 @@ class SearchProblem:
     You do not need to change anything in this class, ever.
     """
 
+    # Observers subscribed with addObserver.  With none, the search functions
+    # skip the hooks altogether.
+    observers = ()
+
+    def addObserver(self, observer):
+        """
+        Subscribes a SearchObserver to the searches run on this problem.
+        """
+        self.observers = self.observers + (observer,)
+
+    def removeObserver(self, observer):
+        self.observers = tuple(o for o in self.observers if o is not observer)
+
     def getStartState(self):
         """
         Returns the start state for the search problem.
@@ -63,6 +87,196 @@ class SearchProblem:
         util.raiseNotDefined()
 
 
+class SearchObserver:
+    """
+    Watches the searches run on a problem it was subscribed to with
+    SearchProblem.addObserver.  All hooks do nothing unless overridden.
+    """
+
+    def onExpand(self, state):
+        "Called when state is expanded, before its successors are pushed."
+        pass
+
+    def onGenerate(self, state, successors):
+        "Called with the (successor, action, stepCost) triples of state."
+        pass
+
+    def onGoal(self, state):
+        "Called when the search reaches the goal state."
+        pass
+
+
+class SearchProgress:
+    """
+    A snapshot of a running search, yielded by the *Stream search functions.
+
+      expanded:     number of nodes expanded so far
+      frontierSize: number of entries waiting on the frontier
+      bestF:        lowest f = g + h on the frontier (for uninformed
+                    searches, the cost of the last node popped)
+      elapsed:      seconds since the search started
+      path:         the actions found, set on the final event only
+      done:         True on the final event
+      exceeded:     on the final event, the reason the SearchBudget ran
+                    out (path is then None)
+    """
+
+    def __init__(self, expanded, frontierSize, bestF, elapsed, path=None, done=False, exceeded=None):
+        self.expanded = expanded
+        self.frontierSize = frontierSize
+        self.bestF = bestF
+        self.elapsed = elapsed
+        self.path = path
+        self.done = done
+        self.exceeded = exceeded
+
+    def __str__(self):
+        if self.exceeded: status = ' (stopped: %s)' % self.exceeded
+        elif self.done: status = ' (done)'
+        else: status = ''
+        return 'expanded=%d frontier=%d bestF=%s elapsed=%.3fs%s' % (
+            self.expanded, self.frontierSize, self.bestF, self.elapsed, status)
+
+
+class SearchBudget:
+    """
+    Limits on a single search, checked cooperatively inside the search loop.
+
+      timeLimit:   seconds of wall-clock time, counted from the start of the
+                   search
+      deadline:    absolute time.time() after which the search must stop
+      maxExpanded: maximum number of node expansions
+      maxFrontier: maximum number of entries on the frontier
+
+    Any limit left as None is not enforced.  cancel() may be called at any
+    time (from a progress consumer, another thread, ...) to stop the search.
+
+    The expansion limit is exact: it is checked before a node is expanded,
+    so a search needing exactly maxExpanded expansions still succeeds.  The
+    other limits are polled every checkEvery expansions so that the main
+    loop stays cheap.
+    """
+
+    def __init__(self, timeLimit=None, deadline=None, maxExpanded=None, maxFrontier=None, checkEvery=64):
+        self.timeLimit = timeLimit
+        self.deadline = deadline
+        self.maxExpanded = maxExpanded
+        self.maxFrontier = maxFrontier
+        self.checkEvery = checkEvery
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def start(self, startTime):
+        """
+        Returns the effective deadline of a search starting at startTime.
+        """
+        deadline = self.deadline
+        if self.timeLimit is not None:
+            limit = startTime + self.timeLimit
+            if deadline is None or limit < deadline: deadline = limit
+        return deadline
+
+    def nextCheck(self, expanded):
+        """
+        Returns the expansion count at which the budget must next be checked,
+        before expanding another node.
+        """
+        step = self.checkEvery
+        if self.maxExpanded is not None and self.maxExpanded - expanded < step:
+            step = max(self.maxExpanded - expanded, 0)
+        return expanded + step
+
+    def check(self, expanded, frontierSize, deadline):
+        """
+        Returns the name of the first limit that has been exceeded, or None.
+        """
+        if self.cancelled: return 'cancelled'
+        if self.maxExpanded is not None and expanded >= self.maxExpanded: return 'expanded'
+        if self.maxFrontier is not None and frontierSize > self.maxFrontier: return 'frontier'
+        if deadline is not None and time.time() >= deadline: return 'time'
+        return None
+
+
+class BudgetExceeded:
+    """
+    Returned by the search functions, in place of a path, when their
+    SearchBudget runs out.
+
+      reason:   'cancelled', 'expanded', 'frontier' or 'time'
+      progress: the final SearchProgress, with the partial statistics
+    """
+
+    def __init__(self, reason, progress):
+        self.reason = reason
+        self.progress = progress
+
+    def __str__(self):
+        return 'Search budget exceeded (%s): %s' % (self.reason, self.progress)
+
+
+class SearchStats:
+    """
+    Counters filled in by a search when one is passed as its stats argument.
+    Searches run without a SearchStats pay nothing for the instrumentation.
+
+      generated:       successors returned by getSuccessors
+      expanded:        nodes expanded
+      duplicatePushes: frontier entries popped for an already expanded state
+      reopenings:      of those, entries that reached the state more cheaply
+                       than when it was expanded (a sign of an inconsistent
+                       heuristic; this graph search does not reopen them)
+      peakFrontier:    largest frontier size seen
+      peakClosed:      largest number of expanded states held
+      heuristicCalls, heuristicTime: calls to the heuristic and seconds spent
+      successorTime:   seconds spent in getSuccessors
+      wallTime:        seconds for the whole search
+    """
+    FIELDS = ['generated', 'expanded', 'duplicatePushes', 'reopenings', 'peakFrontier', 'peakClosed',
+              'heuristicCalls', 'heuristicTime', 'successorTime', 'wallTime']
+
+    def __init__(self):
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+
+    def timedHeuristic(self, heuristic):
+        """
+        Wraps heuristic so that its calls and running time are recorded.
+        """
+        clock = time.perf_counter
+        def timed(state, problem=None):
+            start = clock()
+            value = heuristic(state, problem)
+            self.heuristicTime += clock() - start
+            self.heuristicCalls += 1
+            return value
+        return timed
+
+    def timedSuccessors(self, getSuccessors):
+        """
+        Wraps a getSuccessors method so that the successors generated and the
+        time spent generating them are recorded.
+        """
+        clock = time.perf_counter
+        def timed(state):
+            start = clock()
+            successors = getSuccessors(state)
+            self.successorTime += clock() - start
+            self.generated += len(successors)
+            return successors
+        return timed
+
+    def asDict(self):
+        return dict((field, getattr(self, field)) for field in self.FIELDS)
+
+    def toJson(self):
+        return json.dumps(self.asDict(), sort_keys=True)
+
+    def __str__(self):
+        return ' '.join('%s=%s' % (field, getattr(self, field)) for field in self.FIELDS)
+
+
 def tinyMazeSearch(problem):
     """
     Returns a sequence of moves that solves tinyMaze.  For any other maze, the
@@ -156,40 +370,124 @@ A continuació comentarem els passos que es segueixen en aquesta funció:
     4 - En cas que no haguem arribat a la meta. Ens trobarem amb un altre if. Aquest pregunta si el node actual ha estat visitat. En cas que no sigui així,
     l'afegim al diccionari de visitats i per cada fill fem la funció push corresponent.
 """
-def similarSearch(problem, structure, funcioPush=onlyPush, heuristic=nullHeuristic):
-
+def similarSearchStream(problem, structure, funcioPush=onlyPush, heuristic=nullHeuristic, reportEvery=REPORT_EVERY,
+                        budget=None, stats=None):
+    """
+    Generator version of similarSearch.  Yields a SearchProgress every
+    reportEvery expansions (never, if reportEvery is 0) and a final
+    SearchProgress with done set and the path found.
+
+    Closing the generator (e.g. breaking out of the loop that consumes it)
+    stops the search.  If a SearchBudget is given and runs out, the final
+    event has no path and its exceeded field says which limit was hit.
+    A SearchStats passed as stats is filled in as the search runs.
+    """
+    startTime = time.time()
+    getSuccessors = problem.getSuccessors
+    observers = getattr(problem, 'observers', ())
+    if stats is not None:
+        heuristic = stats.timedHeuristic(heuristic)
+        getSuccessors = stats.timedSuccessors(getSuccessors)
+    if budget is not None:
+        deadline = budget.start(startTime)
+        nextCheck = budget.nextCheck(0)
+    else:
+        nextCheck = -1
+    exceeded = None
     primer = problem.getStartState()
     estructura = structure()
     dicVisitats = dict()
     funcioPush((primer, "noPare", "noDireccio", 0), estructura,heuristic,problem)
     llistaMoviments = []
+    expanded = 0
+    nextReport = reportEvery or -1
+    costActual = 0
 
     while not estructura.isEmpty():
 
         nodeActual, nodePare, direccioPareActual, costActual = estructura.pop()
         if problem.isGoalState(nodeActual):
+            for observer in observers:
+                observer.onGoal(nodeActual)
 
             llistaMoviments.append(direccioPareActual)
             recorreDic = nodePare
 
             while recorreDic in dicVisitats:
 
-                if recorreDic != problem.getStartState():
+                if recorreDic != primer:
 
                     llistaMoviments.append(dicVisitats[recorreDic][1])
 
                 recorreDic = dicVisitats[recorreDic][0]
 
             llistaMoviments.reverse()
-            return llistaMoviments
+            break
 
         if not nodeActual in dicVisitats:
 
-            dicVisitats[nodeActual] = (nodePare, direccioPareActual)
+            if expanded == nextCheck:
+                exceeded = budget.check(expanded, len(estructura), deadline)
+                if exceeded:
+                    _finishStats(stats, expanded, dicVisitats, startTime)
+                    yield SearchProgress(expanded, len(estructura), _frontierBound(estructura, costActual),
+                                         time.time() - startTime, None, True, exceeded)
+                    return
+                nextCheck = budget.nextCheck(expanded)
+
+            dicVisitats[nodeActual] = (nodePare, direccioPareActual, costActual)
+
+            successors = getSuccessors(nodeActual)
+            if observers:
+                for observer in observers:
+                    observer.onExpand(nodeActual)
+                    observer.onGenerate(nodeActual, successors)
 
-            for nodeFill in problem.getSuccessors(nodeActual):
+            for nodeFill in successors:
                 funcioPush((nodeFill[0], nodeActual, nodeFill[1], costActual + nodeFill[2]), estructura, heuristic,problem)
-    return llistaMoviments
+
+            expanded += 1
+            if stats is not None and len(estructura) > stats.peakFrontier:
+                stats.peakFrontier = len(estructura)
+            if expanded == nextReport:
+                nextReport += reportEvery
+                yield SearchProgress(expanded, len(estructura), _frontierBound(estructura, costActual), time.time() - startTime)
+
+        elif stats is not None:
+            stats.duplicatePushes += 1
+            if costActual < dicVisitats[nodeActual][2]:
+                stats.reopenings += 1
+
+    _finishStats(stats, expanded, dicVisitats, startTime)
+    # On the final event bestF is the cost of the goal node that was reached.
+    yield SearchProgress(expanded, len(estructura), costActual, time.time() - startTime, llistaMoviments, True)
+
+def similarSearch(problem, structure, funcioPush=onlyPush, heuristic=nullHeuristic, budget=None, stats=None):
+    """
+    Runs similarSearchStream to completion and returns the path it found, or
+    a BudgetExceeded if the budget ran out first.
+    """
+    for event in similarSearchStream(problem, structure, funcioPush, heuristic, 0, budget, stats):
+        pass
+    if event.exceeded:
+        return BudgetExceeded(event.exceeded, event)
+    return event.path
+
+def _finishStats(stats, expanded, dicVisitats, startTime):
+    if stats is not None:
+        stats.expanded = expanded
+        stats.peakClosed = len(dicVisitats)
+        stats.wallTime = time.time() - startTime
+
+def _frontierBound(estructura, costActual):
+    """
+    The best f value known so far: the lowest priority on a priority queue
+    frontier, or the cost of the last node popped for stacks and queues.
+    """
+    heap = getattr(estructura, 'heap', None)
+    if heap:
+        return heap[0][0]
+    return costActual
 
 """
 @author Gerard 
@@ -198,8 +496,8 @@ problem - Arbre a recorrer, en aquest cas es el mapa del pacman.
 El que es fa per a resoldre aquest algoritme de búsqueda és utilitzar l'algoritme de similarSearch enviant-li a aquest una pila.
 Això s'ha fet perque per al bfs l'algoritme sera similar pero enviant una Queue.
 """
-def depthFirstSearch(problem):
-    return similarSearch(problem, util.Stack)
+def depthFirstSearch(problem, budget=None, stats=None):
+    return similarSearch(problem, util.Stack, budget=budget, stats=stats)
 
 """
 @author Gerard 
@@ -208,19 +506,36 @@ problem - Arbre a recorrer, en aquest cas es el mapa del pacman.
 El que es fa per a resoldre aquest algoritme de búsqueda és utilitzar l'algoritme de similarSearch enviant-li a aquest una Queue.
 Això s'ha fet perque per al dfs l'algoritme sera similar pero enviant una pila.
 """
-def breadthFirstSearch(problem):
-    return similarSearch(problem, util.Queue)
+def breadthFirstSearch(problem, budget=None, stats=None):
+    return similarSearch(problem, util.Queue, budget=budget, stats=stats)
 
 
-def uniformCostSearch(problem):
+def uniformCostSearch(problem, budget=None, stats=None):
     """Search the node of least total cost first."""
     "*** YOUR CODE HERE ***"
-    return similarSearch(problem,util.PriorityQueue,priorityPush)
+    return similarSearch(problem,util.PriorityQueue,priorityPush,budget=budget,stats=stats)
 
 
-def aStarSearch(problem, heuristic=nullHeuristic):
+def aStarSearch(problem, heuristic=nullHeuristic, budget=None, stats=None):
     """Search the node that has the lowest combined cost and heuristic first."""
-    return similarSearch(problem,util.PriorityQueue,priorityPush,heuristic)
+    return similarSearch(problem,util.PriorityQueue,priorityPush,heuristic,budget,stats)
+
+
+# Streaming versions: generators of SearchProgress events, see
+# similarSearchStream.
+
+def depthFirstSearchStream(problem, reportEvery=REPORT_EVERY, budget=None, stats=None):
+    return similarSearchStream(problem, util.Stack, reportEvery=reportEvery, budget=budget, stats=stats)
+
+def breadthFirstSearchStream(problem, reportEvery=REPORT_EVERY, budget=None, stats=None):
+    return similarSearchStream(problem, util.Queue, reportEvery=reportEvery, budget=budget, stats=stats)
+
+def uniformCostSearchStream(problem, reportEvery=REPORT_EVERY, budget=None, stats=None):
+    return similarSearchStream(problem, util.PriorityQueue, priorityPush, reportEvery=reportEvery, budget=budget,
+                               stats=stats)
+
+def aStarSearchStream(problem, heuristic=nullHeuristic, reportEvery=REPORT_EVERY, budget=None, stats=None):
+    return similarSearchStream(problem, util.PriorityQueue, priorityPush, heuristic, reportEvery, budget, stats)
 
 
 # Abbreviations
@@ -228,3 +543,7 @@ bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
 ucs = uniformCostSearch
+bfsStream = breadthFirstSearchStream
+dfsStream = depthFirstSearchStream
+astarStream = aStarSearchStream
+ucsStream = uniformCostSearchStream
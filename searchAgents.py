@@ -34,6 +34,7 @@ description for details.
 Good luck and happy searching!
 """
 import math
+import weakref
 
 from game import Directions
 from game import Agent
@@ -70,11 +71,16 @@ class SearchAgent(Agent):
       depthFirstSearch or dfs
       breadthFirstSearch or bfs
 
+    If stats is given, the search is run with a search.SearchStats and the
+    statistics are written as JSON to the file it names.
 
     Note: You should NOT change any code in SearchAgent
     """
 
-    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic'):
+    # File the SearchStats of each search are written to, if any
+    statsFile = None
+
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', stats=None):
         # Warning: some advanced Python magic is employed below to find the right functions and problems
 
         # Get the search function from the name and heuristic
@@ -93,7 +99,12 @@ class SearchAgent(Agent):
                 raise AttributeError(heuristic + ' is not a function in searchAgents.py or search.py.')
             print('[SearchAgent] using function %s and heuristic %s' % (fn, heuristic))
             # Note: this bit of Python trickery combines the search algorithm and the heuristic
-            self.searchFunction = lambda x: func(x, heuristic=heur)
+            self.searchFunction = lambda x, **kwargs: func(x, heuristic=heur, **kwargs)
+
+        if stats is not None:
+            if 'stats' not in func.__code__.co_varnames:
+                raise AttributeError(fn + ' does not accept search statistics.')
+            self.statsFile = stats
 
         # Get the search problem type from the name
         if prob not in globals().keys() or not prob.endswith('Problem'):
@@ -113,10 +124,18 @@ class SearchAgent(Agent):
         if self.searchFunction == None: raise Exception("No search function provided for SearchAgent")
         starttime = time.time()
         problem = self.searchType(state) # Makes a new search problem
-        self.actions  = self.searchFunction(problem) # Find a path
+        if self.statsFile is not None:
+            stats = search.SearchStats()
+            self.actions = self.searchFunction(problem, stats=stats) # Find a path
+        else:
+            self.actions  = self.searchFunction(problem) # Find a path
         totalCost = problem.getCostOfActions(self.actions)
         print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
         if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
+        if self.statsFile is not None:
+            f = open(self.statsFile, 'w')
+            try: f.write(stats.toJson() + '\n')
+            finally: f.close()
 
     def getAction(self, state):
         """
@@ -134,6 +153,81 @@ class SearchAgent(Agent):
         else:
             return Directions.STOP
 
+def unitCost(pos):
+    "The default PositionSearchProblem cost function: every step costs 1."
+    return 1
+
+# Successor tables built by successorTable, keyed by the id of their walls
+# Grid.  Entries are dropped when the Grid is garbage collected.
+_SUCCESSOR_TABLES = {}
+
+def successorTable(walls):
+    """
+    Returns a flat list, indexed by x * walls.height + y, holding for each
+    cell the tuple of its legal (successor, action, 1) triples, in the
+    North, South, East, West order used by the search problems.
+
+    The table is built once per walls Grid and shared by every problem using
+    that Grid, so the Grid must not be modified afterwards.
+    """
+    table = _SUCCESSOR_TABLES.get(id(walls))
+    if table is not None:
+        return table
+    width, height = walls.width, walls.height
+    moves = [(action, Actions.directionToVector(action))
+             for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]]
+    table = []
+    for x in range(width):
+        for y in range(height):
+            successors = []
+            if not walls[x][y]:
+                for action, (dx, dy) in moves:
+                    nextx, nexty = int(x + dx), int(y + dy)
+                    if 0 <= nextx < width and 0 <= nexty < height and not walls[nextx][nexty]:
+                        successors.append(((nextx, nexty), action, 1))
+            table.append(tuple(successors))
+    _SUCCESSOR_TABLES[id(walls)] = table
+    weakref.finalize(walls, _SUCCESSOR_TABLES.pop, id(walls), None)
+    return table
+
+def costGrid(walls, costFn):
+    """
+    Evaluates costFn once for every free cell of walls and returns the costs
+    as a flat list indexed by x * walls.height + y (walls cost 0).
+    """
+    height = walls.height
+    costs = [0] * (walls.width * height)
+    for x in range(walls.width):
+        column = walls[x]
+        for y in range(height):
+            if not column[y]:
+                costs[x * height + y] = costFn((x, y))
+    return costs
+
+# Cost grids and costed successor tables built by costedSuccessorTable, keyed
+# by the id of their walls Grid and then by the id of the cost function.
+_COST_TABLES = {}
+
+def costedSuccessorTable(walls, costFn):
+    """
+    Returns (costs, table): the costGrid of costFn and a successorTable whose
+    triples carry those costs.  Both are built once per walls Grid and cost
+    function, and shared by every problem using them.
+    """
+    tables = _COST_TABLES.get(id(walls))
+    if tables is None:
+        tables = _COST_TABLES[id(walls)] = {}
+        weakref.finalize(walls, _COST_TABLES.pop, id(walls), None)
+    entry = tables.get(id(costFn))
+    if entry is not None and entry[0] is costFn:
+        return entry[1], entry[2]
+    costs, height = costGrid(walls, costFn), walls.height
+    table = [tuple([(nextState, action, costs[nextState[0] * height + nextState[1]])
+                    for nextState, action, cost in successors])
+             for successors in successorTable(walls)]
+    tables[id(costFn)] = (costFn, costs, table)
+    return costs, table
+
 class PositionSearchProblem(search.SearchProblem):
     """
     A search problem defines the state space, start state, goal test, successor
@@ -145,13 +239,22 @@ class PositionSearchProblem(search.SearchProblem):
     Note: this search problem is fully specified; you should NOT change it.
     """
 
-    def __init__(self, gameState, costFn = lambda x: 1, goal=(1,1), start=None, warn=True, visualize=True):
+    # True when getSuccessors must call costFn itself (see __init__)
+    _lazyCost = False
+    # Flat list of step costs built in cost-grid mode, see costGrid
+    _costGrid = None
+
+    def __init__(self, gameState, costFn = unitCost, goal=(1,1), start=None, warn=True, visualize=True,
+                 precomputeCosts=False):
         """
         Stores the start and goal.
 
         gameState: A GameState object (pacman.py)
         costFn: A function from a search state (tuple) to a non-negative number
         goal: A position in the gameState
+        precomputeCosts: if True, costFn is evaluated once per free cell here
+                         and never called again (cost-grid mode); costFn
+                         must then depend only on the position
         """
         self.walls = gameState.getWalls()
         self.startState = gameState.getPacmanPosition()
@@ -159,31 +262,26 @@ class PositionSearchProblem(search.SearchProblem):
         self.goal = goal
         self.costFn = costFn
         self.visualize = visualize
+        self._successors, self._height = successorTable(self.walls), self.walls.height
+        if costFn is not unitCost:
+            if precomputeCosts:
+                self._costGrid, self._successors = costedSuccessorTable(self.walls, costFn)
+            else:
+                self._lazyCost = True
         if warn and (gameState.getNumFood() != 1 or not gameState.hasFood(*goal)):
             print('Warning: this does not look like a regular search maze')
 
-        # For display purposes
-        self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
-
-
+        # For display purposes: the display (if any) subscribes as an observer
+        self._expanded = 0 # DO NOT CHANGE
+        if visualize:
+            for factory in search.visualObserverFactories:
+                self.addObserver(factory())
 
-        # For display purposes
-        self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
     def getStartState(self):
         return self.startState
 
     def isGoalState(self, state):
-        isGoal = state == self.goal
-
-        # For display purposes only
-        if isGoal and self.visualize:
-            self._visitedlist.append(state)
-            import __main__
-            if '_display' in dir(__main__):
-                if 'drawExpandedCells' in dir(__main__._display): #@UndefinedVariable
-                    __main__._display.drawExpandedCells(self._visitedlist) #@UndefinedVariable
-
-        return isGoal
+        return state == self.goal
 
     def getSuccessors(self, state):
         """
@@ -195,23 +293,19 @@ class PositionSearchProblem(search.SearchProblem):
          successor to the current state, 'action' is the action
          required to get there, and 'stepCost' is the incremental
          cost of expanding to that successor
+
+        With the default unit cost, or in cost-grid mode, the triples come
+        straight from a precomputed table and must not be modified.
         """
 
-        successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
-                successors.append( ( nextState, action, cost) )
+        x,y = state
+        successors = self._successors[x * self._height + y]
+        if self._lazyCost:
+            costFn = self.costFn
+            successors = [(nextState, action, costFn(nextState)) for nextState, action, cost in successors]
 
         # Bookkeeping for display purposes
         self._expanded += 1 # DO NOT CHANGE
-        if state not in self._visited:
-            self._visited[state] = True
-            self._visitedlist.append(state)
 
         return successors
 
@@ -222,13 +316,17 @@ class PositionSearchProblem(search.SearchProblem):
         """
         if actions == None: return 999999
         x,y= self.getStartState()
+        costs = self._costGrid
         cost = 0
         for action in actions:
             # Check figure out the next state and see whether its' legal
             dx, dy = Actions.directionToVector(action)
             x, y = int(x + dx), int(y + dy)
             if self.walls[x][y]: return 999999
-            cost += self.costFn((x,y))
+            if costs is not None:
+                cost += costs[x * self._height + y]
+            else:
+                cost += self.costFn((x,y))
         return cost
 
 class StayEastSearchAgent(SearchAgent):
@@ -241,7 +339,7 @@ class StayEastSearchAgent(SearchAgent):
     def __init__(self):
         self.searchFunction = search.uniformCostSearch
         costFn = lambda pos: .5 ** pos[0]
-        self.searchType = lambda state: PositionSearchProblem(state, costFn, (1, 1), None, False)
+        self.searchType = lambda state: PositionSearchProblem(state, costFn, (1, 1), None, False, precomputeCosts=True)
 
 class StayWestSearchAgent(SearchAgent):
     """
@@ -253,7 +351,7 @@ class StayWestSearchAgent(SearchAgent):
     def __init__(self):
         self.searchFunction = search.uniformCostSearch
         costFn = lambda pos: 2 ** pos[0]
-        self.searchType = lambda state: PositionSearchProblem(state, costFn)
+        self.searchType = lambda state: PositionSearchProblem(state, costFn, precomputeCosts=True)
 
 def manhattanHeuristic(position, problem, info={}):
     "The Manhattan distance heuristic for a PositionSearchProblem"
@@ -529,8 +627,8 @@ class FoodSearchProblem:
             dx, dy = Actions.directionToVector(direction)
             nextx, nexty = int(x + dx), int(y + dy)
             if not self.walls[nextx][nexty]:
-                nextFood = state[1].copy()
-                nextFood[nextx][nexty] = False
+                nextFood = state[1].copy(keepHash=True)
+                nextFood.setCell(nextx, nexty, False)
                 successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
         return successors
 
@@ -674,8 +772,9 @@ class especialPositionSearchProblem(PositionSearchProblem):
         self.startState = start
         self.visualize = visualize
         self.warn = warn
-        self.costFn = lambda x: 1
-        self._visited, self._visitedlist, self._expanded = {}, [], 0  # DO NOT CHANGE
+        self.costFn = unitCost
+        self._successors, self._height = successorTable(walls), walls.height
+        self._expanded = 0  # DO NOT CHANGE
 
 class ClosestDotSearchAgent(SearchAgent):
     "Search for all food using a sequence of searches"
@@ -732,8 +831,9 @@ class AnyFoodSearchProblem(PositionSearchProblem):
         # Store info for the PositionSearchProblem (no need to change this)
         self.walls = gameState.getWalls()
         self.startState = gameState.getPacmanPosition()
-        self.costFn = lambda x: 1
-        self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
+        self.costFn = unitCost
+        self._successors, self._height = successorTable(self.walls), self.walls.height
+        self._expanded = 0 # DO NOT CHANGE
 
     def isGoalState(self, state):
         """
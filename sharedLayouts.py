@@ -0,0 +1,216 @@
+# sharedLayouts.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Layouts published once in shared memory, for worker processes.
+
+The parent publishes a layout, and passes the name of its block to the
+workers, which attach to it:
+
+> shared = sharedLayouts.publish(theLayout)            # in the parent
+> theLayout = sharedLayouts.attach(name).getLayout()   # in a worker
+> ...
+> shared.unlink()                                      # in the parent, at the end
+
+A block holds the layout (pickled, without its grids and tables) and, as
+arrays of cells (cell x * height + y), its walls and food, its legal action
+tables (see Layout.getActionTables) as bitmasks of ACTIONS, and, optionally,
+its maze distances (see Layout.getDistances).  The arrays are memoryviews of
+the block, so workers read them without copying (numpy.asarray turns them
+into arrays, still without copying).  getLayout rebuilds a Layout from the
+block without reading or parsing the .lay file: its walls and food grids
+and its action tables are filled in from the arrays, instead of being
+computed, and its distances are the shared ones, used in place.
+"""
+
+from multiprocessing import shared_memory
+import atexit
+import pickle
+import struct
+
+from game import DIRECTIONS
+import layout
+
+MAGIC = b'PLAY'
+# Bitmask bits of the action tables: those of game.DIRECTIONS
+ACTIONS = DIRECTIONS
+# The bitmask of a cell with no action table (a wall, or on the border)
+NO_ACTIONS = 0xff
+# magic, width, height, length of the pickled layout, whether there are distances
+_HEADER = struct.Struct('<4sHHIB')
+_HEADER_SIZE = 16
+# name -> the SharedLayout this process is attached to, see attach
+_ATTACHED = {}
+
+def _actionMask(actions):
+    if actions is None: return NO_ACTIONS
+    mask = 0
+    for action in actions:
+        mask |= 1 << ACTIONS.index(action)
+    return mask
+
+# bitmask -> the tuple of actions of the action tables
+_MASK_ACTIONS = dict((mask, tuple([action for i, action in enumerate(ACTIONS) if mask >> i & 1]))
+                     for mask in range(1 << len(ACTIONS)))
+_MASK_ACTIONS[NO_ACTIONS] = None
+
+class SharedLayout:
+    """
+    A layout's block of shared memory (see publish and attach), and views of
+    its arrays:
+
+      walls, food      bytes of 0 and 1, one per cell
+      legalActions     the bitmask of the legal actions of each cell
+      ghostActions     a dict from heading to the bitmasks of ghostActions
+      distances        the maze distances, as Layout.getDistances (or None)
+    """
+    def __init__(self, memory, owner):
+        self.memory = memory
+        self.name = memory.name
+        self.owner = owner
+        magic, self.width, self.height, pickleLength, hasDistances = _HEADER.unpack_from(memory.buf, 0)
+        if magic != MAGIC: raise Exception('%s is not a shared layout' % self.name)
+        numCells = self.width * self.height
+        buf = memory.buf
+        offset = _HEADER_SIZE
+        self._pickled = buf[offset:offset + pickleLength]
+        offset += pickleLength + pickleLength % 2
+        self.walls = buf[offset:offset + numCells]
+        self.food = buf[offset + numCells:offset + 2 * numCells]
+        self.legalActions = buf[offset + 2 * numCells:offset + 3 * numCells]
+        offset += 3 * numCells
+        self.ghostActions = {}
+        for heading in ACTIONS:
+            self.ghostActions[heading] = buf[offset:offset + numCells]
+            offset += numCells
+        offset += offset % 2
+        self.distances = None
+        if hasDistances:
+            self.distances = buf[offset:offset + 2 * numCells * numCells].cast('H')
+        self._layout = None
+
+    def getLayout(self):
+        """
+        Returns the layout, built from the block on first use: its walls and
+        food are copied into grids of its grid class from the arrays, its
+        action tables decoded from them, and its distances (if shared) are
+        the block's.  The layout is registered (see layout.registerLayout).
+        """
+        if self._layout is None:
+            state = pickle.loads(self._pickled)
+            gridClass = state.get('gridClass', layout.Layout.gridClass)
+            for name, cells in [('walls', self.walls), ('food', self.food)]:
+                grid = gridClass(self.width, self.height)
+                grid._setCellBytes(cells)
+                state[name] = grid
+            theLayout = layout.Layout.__new__(layout.Layout)
+            theLayout.__dict__.update(state)
+            # The caches are filled in first, so that __setstate__ finds the tables
+            key = layout.registerLayout(theLayout)
+            if key not in layout.ACTION_TABLES_CACHE:
+                legalActions = [_MASK_ACTIONS[mask] for mask in self.legalActions]
+                ghostActions = dict((heading, [_MASK_ACTIONS[mask] for mask in masks])
+                                    for heading, masks in self.ghostActions.items())
+                layout.ACTION_TABLES_CACHE[key] = (legalActions, ghostActions)
+            if self.distances is not None and key not in layout.DISTANCE_CACHE:
+                layout.DISTANCE_CACHE[key] = self.distances
+            theLayout.__setstate__(state)
+            self._layout = theLayout
+        return self._layout
+
+    def distance(self, pos1, pos2):
+        "The maze distance between two grid points, or None (see Layout.getMazeDistance)."
+        if self.distances is None: raise Exception('The distances of %s are not shared' % self.name)
+        height, numCells = self.height, self.width * self.height
+        distance = self.distances[(pos1[0] * height + pos1[1]) * numCells + pos2[0] * height + pos2[1]]
+        if distance == layout.UNREACHABLE: return None
+        return distance
+
+    def close(self):
+        """
+        Detaches from the block.  The views of its arrays must not be used
+        after this, so a worker that uses its layout should stay attached.
+        """
+        if self._layout is not None:
+            key = layout.layoutRef(self._layout)
+            if layout.DISTANCE_CACHE.get(key) is self.distances: del layout.DISTANCE_CACHE[key]
+        _ATTACHED.pop(self.name, None)
+        for view in [self._pickled, self.walls, self.food, self.legalActions, self.distances] + list(self.ghostActions.values()):
+            if view is not None: view.release()
+        self.memory.close()
+
+    def unlink(self):
+        "Closes and destroys the block; for the process that published it."
+        self.close()
+        if self.owner: self.memory.unlink()
+
+def publish(theLayout, distances=None):
+    """
+    Copies theLayout and its tables into a new block of shared memory, and
+    returns its SharedLayout; pass its name to the workers.  With distances,
+    the maze distances are computed (if need be) and shared; by default,
+    they are shared if this process has already computed them.
+    """
+    if distances is None: distances = layout.layoutRef(theLayout) in layout.DISTANCE_CACHE
+    numCells = theLayout.width * theLayout.height
+    state = theLayout.__getstate__()
+    # The grids are in the arrays
+    del state['walls'], state['food']
+    pickled = pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+    legalActions = bytes([_actionMask(actions) for actions in theLayout.legalActions])
+    ghostActions = b''.join([bytes([_actionMask(actions) for actions in theLayout.ghostActions[heading]])
+                             for heading in ACTIONS])
+    arrays = theLayout.walls._cellBytes() + theLayout.food._cellBytes() + legalActions + ghostActions
+
+    offset = _HEADER_SIZE + len(pickled) + len(pickled) % 2
+    distanceOffset = offset + len(arrays)
+    distanceOffset += distanceOffset % 2
+    size = distanceOffset + (2 * numCells * numCells if distances else 0)
+    memory = shared_memory.SharedMemory(create=True, size=size)
+    buf = memory.buf
+    _HEADER.pack_into(buf, 0, MAGIC, theLayout.width, theLayout.height, len(pickled), bool(distances))
+    buf[_HEADER_SIZE:_HEADER_SIZE + len(pickled)] = pickled
+    buf[offset:offset + len(arrays)] = arrays
+    if distances:
+        buf[distanceOffset:size] = memoryview(theLayout.getDistances()).cast('B')
+    return SharedLayout(memory, True)
+
+def attach(name):
+    """
+    Returns the SharedLayout of the block published under name, attaching to
+    it on first use in this process.  Stay attached while using the layout:
+    the attachment lasts until close, or the end of the process.
+
+    The block is the publisher's to destroy.  Processes started by the
+    publisher (such as a multiprocessing Pool's) share its resource tracker,
+    which only destroys blocks the publisher leaves behind; before Python
+    3.13, an unrelated process attaching registers the block with its own
+    tracker, which destroys it when that process exits.
+    """
+    shared = _ATTACHED.get(name)
+    if shared is None:
+        try:
+            memory = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            memory = shared_memory.SharedMemory(name=name)
+        shared = _ATTACHED[name] = SharedLayout(memory, False)
+    return shared
+
+def _closeAttached():
+    "Releases the views of the attached blocks before the interpreter exits."
+    for shared in list(_ATTACHED.values()):
+        try: shared.close()
+        except BufferError: pass
+
+atexit.register(_closeAttached)
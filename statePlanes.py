@@ -0,0 +1,161 @@
+# statePlanes.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Game states as dense feature planes, for learning agents.
+
+StatePlanes(layout).extract(state) returns the planes of a GameState as an
+array of shape (NUM_PLANES, width, height), indexed [plane][x][y] like Grids:
+
+  WALLS, FOOD, CAPSULES   1 where there is a wall, a food dot, a capsule
+  PACMAN                  1 where Pacman is
+  GHOSTS, SCARED_GHOSTS   1 where a ghost is, scared or not (a ghost between
+                          two grid points counts on the nearest one)
+
+The planes are written in place into a buffer, preallocated or given with
+out=; extractBatch does the same for many states at once.  With NumPy the
+buffers are numpy arrays.  Without it, they are flat array.array buffers, in
+the same order (index ((n * NUM_PLANES + plane) * width + x) * height + y).
+"""
+
+from array import array
+
+from layout import layoutRef
+
+try:
+    import numpy
+    _NUMPY_ENABLED = True
+except ImportError:
+    _NUMPY_ENABLED = False
+
+WALLS, FOOD, CAPSULES, PACMAN, GHOSTS, SCARED_GHOSTS = range(6)
+NUM_PLANES = 6
+
+# layout.layoutRef -> wall plane, as cell bytes (see Grid._cellBytes)
+_WALL_PLANES = {}
+
+def wallPlane(layout):
+    """
+    Returns the wall plane of layout as bytes of 0 and 1 in cell index order,
+    built once per layout text and shared by copies of the layout.
+    """
+    key = layoutRef(layout)
+    if key not in _WALL_PLANES:
+        _WALL_PLANES[key] = layout.walls._cellBytes()
+    return _WALL_PLANES[key]
+
+class StatePlanes:
+    """
+    Extracts the feature planes of states of one layout (or of layouts of the
+    same size and walls).  dtype is the numpy dtype of the planes, or the
+    array typecode without NumPy.
+    """
+    def __init__(self, layout, dtype=None, useNumpy=_NUMPY_ENABLED):
+        self.width, self.height = layout.width, layout.height
+        self.cells = self.width * self.height
+        self.useNumpy = useNumpy
+        self.walls = wallPlane(layout)
+        if useNumpy:
+            self.dtype = dtype or numpy.float32
+            self.wallPlane = numpy.frombuffer(self.walls, dtype=numpy.uint8).reshape(self.width, self.height)
+        else:
+            self.dtype = dtype or 'f'
+            # array() reads bytes as machine values: go through a memoryview for 0 and 1
+            self.wallPlane = array(self.dtype, memoryview(self.walls))
+            self.zeroPlanes = array(self.dtype, [0]) * ((NUM_PLANES - CAPSULES) * self.cells)
+        self.buffer = self.allocate()
+
+    def allocate(self, numStates=None):
+        """
+        Returns a zeroed buffer for the planes of one state, or of numStates
+        states with numStates.
+        """
+        if self.useNumpy:
+            shape = (NUM_PLANES, self.width, self.height)
+            if numStates is not None: shape = (numStates,) + shape
+            return numpy.zeros(shape, dtype=self.dtype)
+        return array(self.dtype, [0]) * (NUM_PLANES * self.cells * (numStates or 1))
+
+    def extract(self, state, out=None):
+        """
+        Writes the planes of state into out (by default, into this extractor's
+        own buffer, which the next call overwrites) and returns it.
+        """
+        if out is None: out = self.buffer
+        if not self.useNumpy:
+            self._extractArray(state, out, 0)
+            return out
+        out[WALLS] = self.wallPlane
+        out[FOOD] = numpy.frombuffer(state.data.food._cellBytes(), dtype=numpy.uint8).reshape(self.width, self.height)
+        out[CAPSULES:] = 0
+        for x, y in state.data.capsules:
+            out[CAPSULES, x, y] = 1
+        agentStates = state.data.agentStates
+        x, y = agentStates[0].configuration.pos
+        out[PACMAN, int(x + 0.5), int(y + 0.5)] = 1
+        for ghostState in agentStates[1:]:
+            x, y = ghostState.configuration.pos
+            plane = SCARED_GHOSTS if ghostState.scaredTimer > 0 else GHOSTS
+            out[plane, int(x + 0.5), int(y + 0.5)] = 1
+        return out
+
+    def extractBatch(self, states, out=None):
+        """
+        Writes the planes of the states into out, of shape (len(states),
+        NUM_PLANES, width, height) (by default, a new buffer), and returns it.
+        """
+        if out is None: out = self.allocate(len(states))
+        if not self.useNumpy:
+            for n, state in enumerate(states):
+                self._extractArray(state, out, n * NUM_PLANES * self.cells)
+            return out
+        numStates = len(states)
+        out[:, WALLS] = self.wallPlane
+        food = b''.join([state.data.food._cellBytes() for state in states])
+        out[:, FOOD] = numpy.frombuffer(food, dtype=numpy.uint8).reshape(numStates, self.width, self.height)
+        out[:, CAPSULES:] = 0
+
+        # Gather every capsule and agent as (state, plane, x, y), then set them at once
+        indices, planes, xs, ys = [], [], [], []
+        for n, state in enumerate(states):
+            for x, y in state.data.capsules:
+                indices.append(n); planes.append(CAPSULES); xs.append(x); ys.append(y)
+            agentStates = state.data.agentStates
+            x, y = agentStates[0].configuration.pos
+            indices.append(n); planes.append(PACMAN); xs.append(x); ys.append(y)
+            for ghostState in agentStates[1:]:
+                x, y = ghostState.configuration.pos
+                indices.append(n); planes.append(SCARED_GHOSTS if ghostState.scaredTimer > 0 else GHOSTS)
+                xs.append(x); ys.append(y)
+        xs = (numpy.array(xs, dtype=float) + 0.5).astype(int)
+        ys = (numpy.array(ys, dtype=float) + 0.5).astype(int)
+        out[indices, planes, xs, ys] = 1
+        return out
+
+    def _extractArray(self, state, out, offset):
+        "extract into the flat array out, from offset on."
+        cells, height = self.cells, self.height
+        out[offset:offset + cells] = self.wallPlane
+        out[offset + cells:offset + 2 * cells] = array(self.dtype, memoryview(state.data.food._cellBytes()))
+        start = offset + CAPSULES * cells
+        out[start:offset + NUM_PLANES * cells] = self.zeroPlanes
+        for x, y in state.data.capsules:
+            out[start + x * height + y] = 1
+        agentStates = state.data.agentStates
+        x, y = agentStates[0].configuration.pos
+        out[offset + PACMAN * cells + int(x + 0.5) * height + int(y + 0.5)] = 1
+        for ghostState in agentStates[1:]:
+            x, y = ghostState.configuration.pos
+            plane = SCARED_GHOSTS if ghostState.scaredTimer > 0 else GHOSTS
+            out[offset + plane * cells + int(x + 0.5) * height + int(y + 0.5)] = 1
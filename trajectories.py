@@ -0,0 +1,222 @@
+# trajectories.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Training datasets from recorded games (NumPy is required by this module only).
+
+exportTrajectories replays a directory of recorded games (pickled or compact,
+see pacman.py -r) over a pool of processes, and writes Pacman's trajectories
+as columns, in chunks of chunkSize rows:
+
+  features  the state Pacman acts in: pacmanEnv.stateVector ('vector'), or
+            statePlanes.StatePlanes planes ('planes')
+  action    Pacman's action, as a pacmanEnv.ACTIONS number
+  reward    the change of score until Pacman's next move (ghosts included)
+  done      whether the recording ends after this move
+  episode   the number of the recording, in sorted file name order
+
+Each chunk is an uncompressed chunk-NNNNN.npz file, next to a manifest.json
+listing the chunks and their sizes.  TrajectoryDataset reads them back one
+chunk at a time:
+
+> python trajectories.py recordings/ dataset/ --workers 4
+> for batch in TrajectoryDataset('dataset').batches(256, shuffle=True):
+>     train(batch['features'], batch['action'], batch['reward'], batch['done'])
+"""
+
+import json
+import os
+
+import numpy
+
+from game import DIRECTION_NUMBERS
+import pacman
+import pacmanEnv
+
+COLUMNS = ['features', 'action', 'reward', 'done', 'episode']
+# Action numbers, as pacmanEnv.ACTIONS numbers them
+ACTION_NUMBERS = DIRECTION_NUMBERS
+
+def recordTrajectory(fileName, features='vector'):
+    """
+    Replays the recorded game in fileName, and returns its trajectory as a
+    dict of column arrays (without episode), or None if Pacman never moved.
+    A move the rules reject (from an agent that crashed) ends the trajectory.
+    """
+    recorded = pacman.loadRecordedGame(fileName)
+    theLayout = recorded['layout']
+    numGhosts = recorded.get('numGhosts', theLayout.getNumGhosts())
+    state = pacman.GameState()
+    state.initialize(theLayout, numGhosts)
+    states, actions, scores = [], [], []
+    for agentIndex, action in recorded['actions']:
+        if state.isWin() or state.isLose(): break
+        try:
+            successor = state.generateSuccessor(agentIndex, action)
+        except Exception:
+            break
+        if agentIndex == 0:
+            states.append(state)
+            actions.append(ACTION_NUMBERS[action])
+            scores.append(state.data.score)
+        state = successor
+    if not states: return None
+
+    scores.append(state.data.score)
+    if features == 'planes':
+        import statePlanes
+        featureArray = statePlanes.StatePlanes(theLayout).extractBatch(states)
+    else:
+        featureArray = numpy.array([pacmanEnv.stateVector(state) for state in states], dtype=numpy.float32)
+    done = numpy.zeros(len(states), dtype=bool)
+    done[-1] = True
+    return {'features': featureArray,
+            'action': numpy.array(actions, dtype=numpy.int8),
+            'reward': numpy.diff(numpy.array(scores, dtype=numpy.float32)),
+            'done': done}
+
+def _recordTrajectory(task):
+    episode, fileName, features = task
+    return episode, recordTrajectory(fileName, features)
+
+class _ChunkWriter:
+    "Gathers trajectories, and writes them out chunkSize rows at a time."
+    def __init__(self, directory, chunkSize):
+        self.directory = directory
+        self.chunkSize = chunkSize
+        self.pending = dict((column, []) for column in COLUMNS)
+        self.numPending = 0
+        self.chunks = []
+
+    def add(self, trajectory):
+        for column in COLUMNS:
+            self.pending[column].append(trajectory[column])
+        self.numPending += len(trajectory['done'])
+        while self.numPending >= self.chunkSize:
+            self._write(self.chunkSize)
+
+    def close(self):
+        if self.numPending: self._write(self.numPending)
+
+    def _write(self, numRows):
+        columns = dict((column, numpy.concatenate(arrays)) for column, arrays in self.pending.items())
+        name = 'chunk-%05d.npz' % len(self.chunks)
+        numpy.savez(os.path.join(self.directory, name), **dict((column, array[:numRows]) for column, array in columns.items()))
+        self.chunks.append([name, numRows])
+        self.pending = dict((column, [array[numRows:]]) for column, array in columns.items())
+        self.numPending -= numRows
+
+def exportTrajectories(recordDirectory, directory, workers=1, chunkSize=65536, features='vector'):
+    """
+    Exports the trajectories of the recorded games in recordDirectory (the
+    files named recorded-game-*) into chunks in directory, replaying them
+    over workers processes.  Returns the number of rows.
+    """
+    names = sorted(name for name in os.listdir(recordDirectory) if name.startswith('recorded-game-'))
+    tasks = [(episode, os.path.join(recordDirectory, name), features) for episode, name in enumerate(names)]
+    if not os.path.isdir(directory): os.makedirs(directory)
+    writer = _ChunkWriter(directory, chunkSize)
+    shape = None
+
+    if workers == 1:
+        results = map(_recordTrajectory, tasks)
+    else:
+        import multiprocessing
+        pool = multiprocessing.Pool(workers)
+        results = pool.imap(_recordTrajectory, tasks, chunksize=8)
+    try:
+        for episode, trajectory in results:
+            if trajectory is None: continue
+            if shape is None: shape = trajectory['features'].shape[1:]
+            if trajectory['features'].shape[1:] != shape:
+                raise Exception('%s has features of shape %s, not %s: export games of one layout and number of ghosts together'
+                                % (names[episode], trajectory['features'].shape[1:], shape))
+            trajectory['episode'] = numpy.full(len(trajectory['done']), episode, dtype=numpy.int32)
+            writer.add(trajectory)
+        writer.close()
+    finally:
+        if workers != 1: pool.terminate()
+
+    manifest = {'features': features, 'columns': COLUMNS, 'recordings': names, 'chunks': writer.chunks}
+    f = open(os.path.join(directory, 'manifest.json'), 'w')
+    try: json.dump(manifest, f, indent=1)
+    finally: f.close()
+    return sum(numRows for name, numRows in writer.chunks)
+
+class TrajectoryDataset:
+    """
+    A dataset written by exportTrajectories, read one chunk at a time, so it
+    never needs more memory than a chunk and a batch.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        f = open(os.path.join(directory, 'manifest.json'))
+        try: self.manifest = json.load(f)
+        finally: f.close()
+        self.chunkNames = [name for name, numRows in self.manifest['chunks']]
+
+    def __len__(self):
+        "The number of rows."
+        return sum(numRows for name, numRows in self.manifest['chunks'])
+
+    def loadChunk(self, name):
+        "Returns the columns of a chunk, as a dict of arrays."
+        chunk = numpy.load(os.path.join(self.directory, name))
+        try: return dict((column, chunk[column]) for column in chunk.files)
+        finally: chunk.close()
+
+    def chunks(self):
+        for name in self.chunkNames:
+            yield self.loadChunk(name)
+
+    def batches(self, batchSize, shuffle=False, seed=None, dropLast=False):
+        """
+        Yields the rows as dicts of column arrays of batchSize rows (the last
+        one may be shorter, unless dropLast).  With shuffle, the chunks are
+        visited in random order and the rows of each chunk are shuffled, so
+        rows only mix with rows of their chunk and of its neighbours in the
+        visit.
+        """
+        rng = numpy.random.RandomState(seed)
+        names = self.chunkNames[:]
+        if shuffle: rng.shuffle(names)
+        carry = None
+        for name in names:
+            chunk = self.loadChunk(name)
+            if shuffle:
+                order = rng.permutation(len(chunk['done']))
+                chunk = dict((column, array[order]) for column, array in chunk.items())
+            if carry is not None:
+                chunk = dict((column, numpy.concatenate([carry[column], chunk[column]])) for column in chunk)
+            numRows = len(chunk['done'])
+            start = 0
+            while start + batchSize <= numRows:
+                yield dict((column, array[start:start + batchSize]) for column, array in chunk.items())
+                start += batchSize
+            carry = dict((column, array[start:]) for column, array in chunk.items()) if start < numRows else None
+        if carry is not None and not dropLast: yield carry
+
+if __name__ == '__main__':
+    from optparse import OptionParser
+    parser = OptionParser('USAGE: python trajectories.py RECORD_DIRECTORY DATASET_DIRECTORY <options>')
+    parser.add_option('--workers', dest='workers', type='int', default=1,
+                      help='The number of processes replaying recordings [Default: 1]')
+    parser.add_option('--chunkSize', dest='chunkSize', type='int', default=65536,
+                      help='The number of rows of a chunk [Default: 65536]')
+    parser.add_option('--features', dest='features', type='choice', choices=['vector', 'planes'], default='vector',
+                      help='State features: vector or planes [Default: vector]')
+    options, args = parser.parse_args()
+    if len(args) != 2: parser.error('Give the directory of the recordings and that of the dataset')
+    numRows = exportTrajectories(args[0], args[1], options.workers, options.chunkSize, options.features)
+    print('Wrote %d rows to %s' % (numRows, args[1]))